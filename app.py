@@ -3,6 +3,7 @@ import os
 import json
 import time
 from main import run_measure_gen_custom
+from src.engine import parse_seed
 from src.reformatter import TestCaseReformatter
 from src.progress import progress_tracker
 
@@ -67,7 +68,11 @@ def index():
         vsd_path = VSD_PATH
         if 'vsd_file' in request.files and request.files['vsd_file'].filename:
             vsd_file = request.files['vsd_file']
-            vsd_path = os.path.join(UPLOAD_FOLDER, "VSD_Manual_Upload.xlsx")
+            # Keep the extension so CSV/Parquet VSDs are loaded with the right reader
+            vsd_ext = os.path.splitext(vsd_file.filename)[1].lower()
+            if vsd_ext not in ('.xlsx', '.csv', '.parquet'):
+                vsd_ext = '.xlsx'
+            vsd_path = os.path.join(UPLOAD_FOLDER, f"VSD_Manual_Upload{vsd_ext}")
             vsd_file.save(vsd_path)
             flash(f"VSD file uploaded: {vsd_file.filename}", "success")
 
@@ -117,6 +122,13 @@ def index():
                 return redirect(url_for('index'))
 
         elif action == 'generate':
+            # Same validation as the CLI --seed; a typo must not silently become an unseeded run
+            try:
+                seed = parse_seed(request.form.get('seed', ''))
+            except ValueError as e:
+                flash(f"❌ Invalid seed: {e}", "error")
+                return redirect(url_for('index'))
+
             flash(f"🚀 Generating mockup for {measure}...", "info")
             try:
                 # Check if config exists
@@ -144,12 +156,16 @@ def index():
                 # Get generation settings
                 mocking_depth = request.form.get('mocking_depth', 'population')
                 column_scope = request.form.get('column_scope', 'all')
+                output_format = request.form.get('output_format', 'xlsx')
+                use_cache = request.form.get('use_cache') == 'on'
                 
                 # Show settings info
                 if mocking_depth == 'scenario':
                     flash(f"🎯 Scenario Mode: Generating only explicit events (clean output)", "info")
                 if column_scope == 'mandatory':
                     flash(f"📉 Lean Mode: Generating only mandatory compliance fields", "info")
+                if seed is not None and use_cache:
+                    flash(f"♻️ Seed {seed}: an identical earlier run is served from the output cache", "info")
 
                 # Handle Delta Run
                 baseline_path = None
@@ -177,9 +193,17 @@ def index():
                     mocking_depth=mocking_depth,
                     column_scope=column_scope,
                     baseline_path=baseline_path,
-                    delta_run=delta_run
+                    delta_run=delta_run,
+                    output_format=output_format,
+                    seed=seed,
+                    use_cache=use_cache
                 )
                 
+                if output_file and os.path.isdir(output_file):
+                    # CSV/Parquet write one file per table: download them as one zip
+                    import shutil
+                    output_file = shutil.make_archive(output_file, 'zip', output_file)
+
                 if output_file and os.path.exists(output_file):
                     flash(f"✅ Mockup generated successfully!", "success")
                     return send_file(output_file, as_attachment=True, download_name=os.path.basename(output_file))
@@ -1,5 +1,4 @@
 import pandas as pd
-import json
 import os
 import time
 import yaml
@@ -15,11 +14,13 @@ load_dotenv()
 # ⚡ Performance Optimization: Global caches to avoid reloading heavy resources
 _vsd_cache = {}
 _ai_extractor_cache = None
+# Measures whose data_columns_info.json tables are known to exist (see _ensure_schema)
+_expanded_schemas = set()
 
-def run_measure_gen_custom(measure_name, testcase_path, vsd_path, skip_quality_check=False, disable_ai=None, validate_ncqa=False, model_name="qwen2:0.5b", mocking_depth='population', column_scope='all', baseline_path=None, delta_run=False):
+def run_measure_gen_custom(measure_name, testcase_path, vsd_path, skip_quality_check=False, disable_ai=None, validate_ncqa=False, model_name="qwen2:0.5b", mocking_depth='population', column_scope='all', baseline_path=None, delta_run=False, batch=False, workers=1, seed=None, reuse_templates=False, volume_size=100, output_format=None, use_cache=True):
     """
     Core function for running measure generation with explicit paths.
-    Returns the path to the generated output file.
+    Returns the path to the generated output file (or directory, for csv/parquet output).
     
     Args:
         measure_name: Name of the measure (e.g., 'PSA')
@@ -28,8 +29,17 @@ def run_measure_gen_custom(measure_name, testcase_path, vsd_path, skip_quality_c
         skip_quality_check: If True, skips quality checks for faster generation
         disable_ai: If True, skips AI Extractor (faster). If None, checks DISABLE_AI_EXTRACTOR env var
         model_name: Name of the Ollama model to use
-        mocking_depth: 'population' (default) or 'scenario'
+        mocking_depth: 'population' (default), 'scenario' or 'volume' (volume_size members per scenario, streamed out in chunks)
         column_scope: 'all' (default) or 'mandatory'
+        batch: If True, generates all scenarios at once into column arrays (large populations; ignores workers and reuse_templates)
+        workers: Number of processes for scenario generation (1 = serial; output is identical)
+        seed: Run seed for every random draw (codes, demographics, lab values, IDs); same seed -> same output
+        reuse_templates: If True, scenarios that differ only in member ID are generated once and copied
+        volume_size: Synthetic members per scenario when mocking_depth='volume'
+        output_format: 'xlsx', 'csv' (one file per table), 'parquet' (one file per table) or 'sqlite';
+            None = xlsx, or csv in volume mode
+        use_cache: If True, a seeded run whose inputs (file contents), options and seed match an
+            earlier run returns that run's artifact (and quality report) from OUTPUT_DIR/.cache
     """
     start_time = time.time()
     measure_name = measure_name.upper()
@@ -38,9 +48,7 @@ def run_measure_gen_custom(measure_name, testcase_path, vsd_path, skip_quality_c
     config_path = os.path.join(config_dir, f'{measure_name}.yaml')
     
     # ⚡ Automated Schema Expansion: Ensure physical tables exist for this measure
-    from src.schema_manager import SchemaManager
-    sm = SchemaManager()
-    sm.expand_schema(measure_name)
+    _ensure_schema(measure_name)
     
     # ⚡ Universal Fallback: If no specific config exists, use the Universal template
     if not os.path.exists(config_path):
@@ -51,20 +59,47 @@ def run_measure_gen_custom(measure_name, testcase_path, vsd_path, skip_quality_c
         print(f"Skipping {measure_name}: Test case file not found at {testcase_path}")
         return None
 
-    # ⚡ Use cached VSD Manager (saves 10-30 seconds on subsequent runs)
-    if vsd_path not in _vsd_cache:
-        print("📚 Loading VSD (first time only, this may take 10-30 seconds)...")
-        vsd_load_start = time.time()
-        _vsd_cache[vsd_path] = VSDManager(vsd_path, measurement_year=2026)
-        print(f"   ✓ VSD loaded in {time.time() - vsd_load_start:.2f}s")
-    else:
-        print("⚡ Using cached VSD (instant!)")
-    vsd_manager = _vsd_cache[vsd_path]
-    
-    # ⚡ Use cached AI Extractor (saves 5-15 seconds on subsequent runs)
     if disable_ai is None:
         disable_ai = os.getenv('DISABLE_AI_EXTRACTOR', 'false').lower() == 'true'
+
+    # ⚡ Output cache: identical inputs, options and seed return the stored artifact without
+    # regenerating. Unseeded runs are random by design, so they always generate.
+    cache = cache_key = None
+    output_dir = os.getenv('OUTPUT_DIR', 'output')
+    quality_report = f'{measure_name}_Quality_Report.xlsx'
+    wants_report = not skip_quality_check and mocking_depth != 'volume'
+    if use_cache and seed is not None:
+        from src.output_cache import OutputCache
+        cache = OutputCache(os.path.join(output_dir, '.cache'))
+        cache_key = cache.key(
+            files={
+                'testcase': testcase_path, 'vsd': vsd_path, 'config': config_path, 'schema_map': schema_path,
+                'columns': 'data_columns_info.json', 'products': os.path.join(config_dir, 'products.yaml'),
+                'file_ids': os.path.join(config_dir, 'file_ids.yaml'), 'medication_codes': 'data/HEDIS_Medication_Codes.json',
+                'baseline': baseline_path if delta_run else None,
+            },
+            options={
+                'measure': measure_name, 'depth': mocking_depth, 'scope': column_scope, 'seed': seed,
+                'batch': batch, 'reuse_templates': reuse_templates, 'volume_size': volume_size,
+                'format': output_format, 'ai_model': None if disable_ai else model_name, 'delta_run': delta_run,
+            })
+        # The quality report is a function of the same inputs: a hit restores the one stored
+        # with the artifact, and an entry generated without checks is a miss when they are wanted
+        cached = cache.fetch(cache_key, output_dir, require=[quality_report] if wants_report else [])
+        if cached:
+            print(f"♻️  {measure_name}: inputs unchanged, reusing cached output ({cache_key[:12]})")
+            if wants_report:
+                print(f"📄 Quality report restored: {os.path.join(output_dir, quality_report)}")
+            print(f"\n✅ Success! {measure_name} Mockup restored at {cached}")
+            print(f"\n⏱️  Total generation time: {time.time() - start_time:.2f} seconds")
+            return cached
+
+    # ⚡ Use cached VSD Manager (saves 10-30 seconds on subsequent runs)
+    vsd_manager = _get_vsd_manager(vsd_path)
+    # The cached manager outlives this run: reset its default stream to this run's seed
+    vsd_manager.reseed(seed)
     
+    # ⚡ Use cached AI Extractor (saves 5-15 seconds on subsequent runs)
     global _ai_extractor_cache
     extractor = None
     
@@ -118,19 +153,129 @@ def run_measure_gen_custom(measure_name, testcase_path, vsd_path, skip_quality_c
             else:
                 baseline_parser = TestCaseParser(baseline_path, extractor=extractor)
     
-    engine = MockupEngine(config_path, schema_path, vsd_manager=vsd_manager, measure_name_override=measure_name, mocking_depth=mocking_depth, column_scope=column_scope)
+    engine = MockupEngine(config_path, schema_path, vsd_manager=vsd_manager, measure_name_override=measure_name, mocking_depth=mocking_depth, column_scope=column_scope, seed=seed, reuse_templates=reuse_templates)
     
     # Load config for parser
     with open(config_path) as f:
         measure_config = yaml.safe_load(f)
 
-    result = _process_measure(measure_config, measure_name, parser, engine, skip_quality_check=skip_quality_check, validate_ncqa=validate_ncqa, baseline_parser=baseline_parser)
+    result = _process_measure(measure_config, measure_name, parser, engine, skip_quality_check=skip_quality_check, validate_ncqa=validate_ncqa, baseline_parser=baseline_parser, batch=batch, workers=workers, volume_size=volume_size, output_format=output_format)
     
+    if cache and result:
+        cache.store(cache_key, result, measure_name, extras=[os.path.join(output_dir, quality_report)] if wants_report else [])
+
     total_time = time.time() - start_time
     print(f"\n⏱️  Total generation time: {total_time:.2f} seconds")
     
     return result
 
+def _ensure_schema(measure_name):
+    """Expands data_columns_info.json for a measure once per process."""
+    if measure_name in _expanded_schemas:
+        return
+    from src.schema_manager import SchemaManager
+    SchemaManager().expand_schema(measure_name)
+    _expanded_schemas.add(measure_name)
+
+def _get_vsd_manager(vsd_path):
+    """Cached VSD for vsd_path: the shared VSD server when one serves it, else a local VSDManager."""
+    # ⚡ Shared VSD server (python -m src.vsd_server): one resident index for all workers
+    if vsd_path not in _vsd_cache and os.getenv('VSD_SERVER_ADDRESS'):
+        from src.vsd_server import connect_if_serving
+        client = connect_if_serving(vsd_path, os.getenv('VSD_SERVER_ADDRESS'))
+        if client is not None:
+            print(f"📡 Using VSD server at {client.address}")
+            _vsd_cache[vsd_path] = client
+    
+    if vsd_path not in _vsd_cache:
+        print("📚 Loading VSD (first time only, this may take 10-30 seconds)...")
+        vsd_load_start = time.time()
+        _vsd_cache[vsd_path] = VSDManager(vsd_path, measurement_year=2026)
+        print(f"   ✓ VSD loaded in {time.time() - vsd_load_start:.2f}s")
+    else:
+        print("⚡ Using cached VSD (instant!)")
+    return _vsd_cache[vsd_path]
+
+def _find_testcase(measure, testcase=None):
+    """(measure, test case path) for a CLI measure argument: explicit file, data dir match or *_STANDARD file."""
+    data_dir = os.getenv('DATA_DIR', 'data')
+    testcase_dir = os.getenv('TESTCASE_DIR', data_dir)
+    tc_default = os.path.join(testcase_dir, f'{measure}_MY2026_TestCase.xlsx')
+    tc_path = testcase if testcase else tc_default
+    
+    if not os.path.exists(tc_path) and not testcase:
+        if os.path.exists(measure):
+            tc_path = measure
+            measure = os.path.basename(measure).split('_')[0].upper()
+        else:
+            try:
+                candidates = [f for f in os.listdir(testcase_dir) if f.upper().startswith(measure.upper()) and f.endswith(('.xlsx', '.csv'))]
+                if candidates:
+                    tc_path = os.path.join(testcase_dir, candidates[0])
+                    print(f"🔍 Auto-detected test case: {tc_path}")
+            except:
+                pass
+
+    if not os.path.exists(tc_path) and not testcase:
+        standard_path = os.path.join(data_dir, f'{measure}_STANDARD.xlsx')
+        if os.path.exists(standard_path): tc_path = standard_path
+    return measure, tc_path
+
+def _init_measure_worker():
+    # A forked worker inherits the parent's caches; a VSD server connection must not be shared
+    from src.vsd_server import VSDClient
+    for path, vsd in list(_vsd_cache.items()):
+        if isinstance(vsd, VSDClient):
+            del _vsd_cache[path]
+
+def _run_measure_job(measure, tc_path, vsd_path, options):
+    """One measure of a run_measures() batch: (measure, output, seconds, error)."""
+    start = time.time()
+    try:
+        output = run_measure_gen_custom(measure, tc_path, vsd_path, **options)
+        return measure, output, time.time() - start, None
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        return measure, None, time.time() - start, f"{type(e).__name__}: {e}"
+
+def run_measures(measures, vsd_path, jobs=1, testcase=None, **options):
+    """
+    Generates several measures, up to `jobs` at a time in worker processes.
+    Shared work happens once, up front: test case discovery, schema expansion (the only
+    writer of data_columns_info.json), the VSD index and medication codes (inherited by
+    forked workers). Each measure writes its own output; a per-measure timing summary is
+    printed at the end. Returns {measure: output path, or None if it failed/was skipped}.
+    """
+    from src.engine import load_medication_codes
+    batch_start = time.time()
+    targets = [_find_testcase(measure, testcase) for measure in measures]
+    for measure, _ in targets:
+        _ensure_schema(measure.upper())
+
+    jobs = max(1, min(jobs, len(targets)))
+    if jobs == 1:
+        results = [_run_measure_job(measure, tc_path, vsd_path, options) for measure, tc_path in targets]
+    else:
+        # ⚡ Measure-level pool: shared inputs are loaded here once, not once per measure
+        _get_vsd_manager(vsd_path)
+        med_codes_path = os.path.join(os.getcwd(), 'data', 'HEDIS_Medication_Codes.json')
+        if os.path.exists(med_codes_path):
+            load_medication_codes(med_codes_path)
+        from concurrent.futures import ProcessPoolExecutor
+        print(f"📊 Generating {len(targets)} measures on {jobs} parallel jobs...")
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_measure_worker) as pool:
+            futures = [pool.submit(_run_measure_job, measure, tc_path, vsd_path, options) for measure, tc_path in targets]
+            results = [future.result() for future in futures]
+
+    if len(results) > 1:
+        print(f"\n📋 Batch summary ({len(results)} measures, {jobs} job(s), {time.time() - batch_start:.1f}s wall):")
+        for measure, output, seconds, error in results:
+            status = '✅' if output else '❌'
+            print(f"   {status} {measure:<8} {seconds:7.1f}s  {output or error or 'skipped (no test case or no changes)'}")
+        print(f"   Σ {sum(r[2] for r in results):.1f}s of measure time")
+    return {measure: output for measure, output, _, _ in results}
+
 def _is_standard_format(file_path):
     if '_STANDARD' in file_path.upper():
         return True
@@ -154,7 +299,62 @@ def run_measure_gen(measure_name):
     vsd_path = os.getenv('VSD_PATH', 'data/VSD_MY2026.xlsx')
     return run_measure_gen_custom(measure_name, testcase_path, vsd_path)
 
-def _process_measure(measure_config, measure_name, parser, engine, output_path=None, audit_logger=None, skip_quality_check=False, validate_ncqa=False, baseline_parser=None):
+def _seed_arg(value):
+    """argparse type for --seed: a non-negative 64-bit integer."""
+    import argparse
+    from src.engine import parse_seed
+    try:
+        return parse_seed(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def _as_row_store(data_store, batch_tables):
+    """Row-dict view of data_store for checkers, converting batch-generated tables."""
+    return {name: (batch_tables[name].to_rows() if name in batch_tables else rows) for name, rows in data_store.items()}
+
+def _process_volume(measure_name, engine, scenarios, volume_size, output_path=None, output_format='csv', chunk_size=10000):
+    """
+    Volume mode: expands every scenario into volume_size members and generates them in
+    fixed-size columnar chunks, appending each chunk to the output sink (one CSV per table
+    by default). Memory stays bounded by chunk_size whatever the total (a 50-scenario
+    file x 20000 = 1M members). Quality/NCQA checks need the whole dataset in memory and
+    are skipped.
+    """
+    from itertools import islice
+    import numpy as np
+    from src.progress import progress_tracker
+    from src.output_sinks import FORMATS, open_sink
+
+    if not output_path:
+        output_path = os.path.join(os.getenv('OUTPUT_DIR', 'output'), f'{measure_name}_MY2026_Volume' + FORMATS[output_format])
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    sink = open_sink(output_format, output_path, engine.output_columns.get)
+
+    total = len(scenarios) * volume_size
+    print(f"📊 Volume mode: {len(scenarios)} scenarios x {volume_size} = {total} members (chunks of {chunk_size})...")
+    print("⚠️  Quality and NCQA checks are skipped in volume mode.")
+
+    variants = engine.expand_volume(scenarios, volume_size)
+    done = 0
+    while True:
+        chunk = list(islice(variants, chunk_size))
+        if not chunk:
+            break
+        tables = engine.generate_batch(chunk, rng=np.random.default_rng([engine.seed, done]), start=done)
+        for sheet_name, rows in tables.items():
+            if len(rows):
+                sink.sheet(sheet_name).write_frame(rows.to_frame(engine.output_columns.get(sheet_name)))
+        done += len(chunk)
+        print(f"  Progress: {done}/{total} members generated ({done*100//total}%)")
+        progress_tracker.update(f"🔄 Volume: {done}/{total} members for {measure_name}...", member_count=done)
+
+    written = sink.close()
+    for sheet_name in sorted(written):
+        print(f"  Written {written[sheet_name]} rows to {sheet_name}")
+    print(f"\n✅ Success! {measure_name} volume dataset generated at {output_path}")
+    return output_path
+
+def _process_measure(measure_config, measure_name, parser, engine, output_path=None, audit_logger=None, skip_quality_check=False, validate_ncqa=False, baseline_parser=None, batch=False, workers=1, volume_size=100, output_format=None):
     print(f"\n--- Processing {measure_name} ---")
     
     # 1. Parse Scenarios
@@ -199,138 +399,69 @@ def _process_measure(measure_config, measure_name, parser, engine, output_path=N
             print("⚠️ No changes detected! Nothing to generate.")
             return None
     
+    # Columnar generation (--batch, volume mode) is single-process and never stamps templates
+    if batch or engine.mocking_depth == 'volume':
+        ignored = [flag for flag, on in (('--workers', workers > 1), ('--reuse-templates', engine.reuse_templates)) if on]
+        if ignored:
+            mode = '--batch' if batch and engine.mocking_depth != 'volume' else 'volume mode'
+            print(f"⚠️  {' and '.join(ignored)} ignored: {mode} uses single-process columnar generation.")
+
+    # ⚡ Volume mode: N synthetic members per scenario, streamed out chunk by chunk
+    if engine.mocking_depth == 'volume':
+        return _process_volume(measure_name, engine, scenarios, volume_size, output_path, output_format or 'csv')
+
+    output_format = output_format or 'xlsx'
+    output_dir = os.getenv('OUTPUT_DIR', 'output')
+    from src.output_sinks import FORMATS, open_sink
+    if not output_path:
+        output_path = os.path.join(output_dir, f'{measure_name}_MY2026_Mockup_v20' + FORMATS[output_format])
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    # ⚡ Output sink (streaming xlsx, per-table CSV/Parquet or SQLite), columns in the engine's resolved order
+    from datetime import datetime
+    sink = open_sink(output_format, output_path, engine.output_columns.get,
+                     created=datetime(2026, 1, 1) if engine.seeded else None)
+    # Checks need the whole dataset in memory; without them rows go straight to the sink
+    stream = skip_quality_check
+
     # 2. Containers for data
     data_store = {}
-    for table_key, table_info in engine.schema['tables'].items():
-        table_name = table_info['name']
-        data_store[table_name] = []
+    for layout in engine.layouts.values():
+        data_store[layout.name] = sink.sheet(layout.name) if stream else []
 
     # 3. Process each scenario
     from src.progress import progress_tracker
     progress_tracker.update(f"🔄 Processing {len(scenarios)} scenarios for {measure_name}...", member_count=0)
     
-    print(f"📊 Processing {len(scenarios)} scenarios...")
-    for idx, sc in enumerate(scenarios, 1):
-        mem_id = sc['id']
-        if idx % 10 == 0 or idx == len(scenarios):
-            print(f"  Progress: {idx}/{len(scenarios)} scenarios processed ({idx*100//len(scenarios)}%)")
-        
-        overrides = sc.get('overrides', {})
-        
-        # Member Base
-        member_table = engine.schema['tables']['member']['name']
-        data_store[member_table].append(engine.generate_member_base(
-            mem_id, sc['age'], sc.get('gender', 'M'), 
-            overrides=overrides
-        ))
-        
-        # Enrollment
-        enrollment_table = engine.schema['tables']['enrollment']['name']
-        data_store[enrollment_table].extend(engine.generate_enrollments(
-            mem_id, 
-            sc.get('product_line', 'Medicare'),
-            spans=sc.get('enrollment_spans'),
-            overrides=overrides
-        ))
-        
-        # Visits
-        v_table, v_rows = engine.generate_visits(mem_id, spans=sc.get('visit_spans'), overrides=overrides, product_line=sc.get('product_line', 'Commercial'))
-        data_store[v_table].extend(v_rows)
+    # ⚡ Columnar batch mode: one vectorized pass over all scenarios
+    batch_tables = {}
+    if batch:
+        print(f"📊 Batch-generating {len(scenarios)} scenarios...")
+        batch_tables = engine.generate_batch(scenarios)
+        data_store.update(batch_tables)
+    elif workers > 1 and len(scenarios) > 1:
+        # ⚡ Process pool: contiguous scenario chunks, merged back in scenario order
+        from src.parallel import generate_parallel
+        print(f"📊 Processing {len(scenarios)} scenarios on {workers} workers...")
+        def report(done, total):
+            print(f"  Progress: {done}/{total} scenarios processed ({done*100//total}%)")
+        generate_parallel(engine, scenarios, workers, data_store, progress=report)
+    else:
+        print(f"📊 Processing {len(scenarios)} scenarios...")
+        for idx, sc in enumerate(scenarios, 1):
+            if idx % 10 == 0 or idx == len(scenarios):
+                print(f"  Progress: {idx}/{len(scenarios)} scenarios processed ({idx*100//len(scenarios)}%)")
 
-        # 4. Compliance Events
-        # ⚡ Unified Event Loop (Supports Multiple Events per Scenario)
-        
-        # Helper: Ensure overrides are lists
-        if 'events' in overrides:
-             for k, v in overrides['events'].items():
-                 if isinstance(v, dict):
-                     overrides['events'][k] = [v]
-        
-        # Helper: Map component names to config index (for Legacy ED1/ED2 support)
-        comp_map = {c['name']: i for i, c in enumerate(engine.measure['rules']['clinical_events']['numerator_components'])}
-        
-        # Track generated counts per type to match metadata
-        gen_counts = {} 
-        
-        # ⚡ AUTO-INJECT DENOMINATOR COMPONENTS (For Multi-Step Measures)
-        # For complex measures like SMD, SPC, SPD: automatically generate identification events
-        # even if not explicitly in test case scenarios
-        auto_events = []
-        if 'denominator_components' in engine.measure['rules']['clinical_events']:
-            for denom_comp in engine.measure['rules']['clinical_events']['denominator_components']:
-                comp_name = denom_comp['name']
-                # Only auto-add if not already in compliant list
-                if comp_name not in sc['compliant']:
-                    auto_events.append(comp_name)
-        
-        # Iterate through ALL compliant events + Auto-Injected Denominator Components
-        all_events = auto_events + sc['compliant']  # Denominator first, then numerator
-        for event_name in all_events:
-            # Get Component Config Index
-            comp_idx = comp_map.get(event_name, -1)
-            
-            # Metadata Retrieval
-            specific_meta = {}
-            if 'events' in overrides and event_name in overrides['events']:
-                 meta_list = overrides['events'][event_name]
-                 current_count = gen_counts.get(event_name, 0)
-                 if current_count < len(meta_list):
-                     specific_meta = meta_list[current_count]
-            
-            # Legacy ED1/ED2 Support (Apply to first instance only)
-            if 'date' not in specific_meta and comp_idx != -1 and gen_counts.get(event_name, 0) == 0:
-                 legacy_date = overrides.get('events_by_index', {}).get(comp_idx + 1)
-                 if legacy_date:
-                     specific_meta['date'] = legacy_date
-            
-            # Global ED override (if still no date)
-            if 'date' not in specific_meta and sc.get("event_date_override"):
-                 specific_meta['date'] = sc.get("event_date_override")
-
-            # Generate (injecting specific_metadata for the new engine logic)
-            # We copy overrides to avoid polluting global state, but it's shallow copy of dict
-            call_overrides = overrides.copy()
-            call_overrides['specific_metadata'] = specific_meta
-            
-            result = engine.generate_clinical_event(
-                mem_id, event_name, is_compliant=True, 
-                offset_days=len(data_store.get('visit', []))*5, # Stagger slightly
-                overrides=call_overrides,
-                product_line=sc.get('product_line', 'Commercial')
-            )
-            
-            # Smart Handler: Support both Single (Table, Row) and List [(Table, Row), ...]
-            events_to_process = []
-            if isinstance(result, list):
-                events_to_process = result
-            else:
-                events_to_process = [result]
-                
-            for table_name, row in events_to_process:
+            # Member, Enrollment, Visits, Compliance Events, Exclusions, Monthly Flags
+            for table_name, row in engine.generate_scenario_rows(sc, idx - 1):
                 if table_name and table_name in data_store:
                     data_store[table_name].append(row)
-            
-            gen_counts[event_name] = gen_counts.get(event_name, 0) + 1
-
-        # 5. Exclusion Events
-        for excl_name in sc['excluded']:
-            table_name, row = engine.generate_exclusion(mem_id, excl_name, overrides=overrides)
-            if table_name and table_name in data_store:
-                data_store[table_name].append(row)
-        
-        # 6. Monthly Flags (Structured Overrides)
-        m_table, m_rows = engine.generate_monthly_membership(mem_id, sc.get('monthly_overrides', []))
-        if m_table and m_rows:
-            data_store[m_table].extend(m_rows)
 
     # 4. Quality Checks
-    with open('data_columns_info.json', 'r') as f:
-        full_schema = json.load(f)
-
     if not skip_quality_check:
         print("\n🔍 Running data quality checks...")
         from src.quality_checker import DataQualityChecker
-        quality_checker = DataQualityChecker(data_store, full_schema)
+        quality_checker = DataQualityChecker(_as_row_store(data_store, batch_tables), engine.column_schema)
         quality_report = quality_checker.check_all()
         quality_report_path = os.path.join(os.getenv('OUTPUT_DIR', 'output'), f'{measure_name}_Quality_Report.xlsx')
         quality_checker.export_report(quality_report_path)
@@ -345,58 +476,23 @@ def _process_measure(measure_config, measure_name, parser, engine, output_path=N
             ncqa_spec_path = f'config/ncqa/{measure_name}_NCQA.yaml'
             vsd_manager = engine.vsd_manager if hasattr(engine, 'vsd_manager') else None
             checker = NCQAComplianceChecker(measure_config, ncqa_spec_path, vsd_manager)
-            compliance = checker.check_compliance(data_store, scenarios)
+            compliance = checker.check_compliance(_as_row_store(data_store, batch_tables), scenarios)
             print(f"   Compliance Score: {compliance['score']}/100")
         except:
             pass
 
-    output_dir = os.getenv('OUTPUT_DIR', 'output')
     print("\n📝 Writing output file...")
-    if not output_path:
-        output_path = os.path.join(output_dir, f'{measure_name}_MY2026_Mockup_v20.xlsx')
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        # Use a set to track all tables that have data
-        all_target_tables = set(engine.schema['tables'][t]['name'] for t in engine.schema['tables'])
-        all_target_tables.update(data_store.keys())
-        
-        has_written = False
-        # Sort to keep stable order (Member, Enrollment first usually)
-        for sheet_name in sorted(list(all_target_tables)):
-            rows = data_store.get(sheet_name, [])
-            if not rows: continue
-            
-            df = pd.DataFrame(rows)
-            
-            # ⚡ ROBUSTNESS: Dynamic Column Selection (Prefix-Independent)
-            cols = full_schema.get(sheet_name)
-            if not cols:
-                # Extract the logical part of the table name (e.g. SMD_VISIT_IN -> VISIT)
-                parts = sheet_name.split('_')
-                logical_type = parts[1] if len(parts) > 1 else 'VISIT'
-                
-                # Try to find ANY matching table type in the master schema
-                # e.g. If looking for SMD_VISIT_IN, use the columns from PSA_VISIT_IN
-                for existing_sheet in full_schema.keys():
-                    if f'_{logical_type}_' in existing_sheet:
-                        cols = full_schema[existing_sheet]
-                        print(f"    ✨ Auto-mapped {sheet_name} to {existing_sheet} column structure")
-                        break
-            
-            if cols:
-                # Reindex to match requested schema columns
-                # We use union of existing and requested to avoid losing data
-                df = df.reindex(columns=cols)
-            
-            # Excel sheet names max 31 chars
-            df.to_excel(writer, sheet_name=sheet_name[:31], index=False)
-            print(f"  Written {len(df)} rows to {sheet_name}")
-            has_written = True
-            
-        if not has_written:
-            pd.DataFrame([{"Info": "No data generated"}]).to_excel(writer, sheet_name="Empty_Report")
-    
+    # Sort to keep stable order (Member, Enrollment first usually)
+    for sheet_name in sorted(data_store):
+        rows = data_store[sheet_name]
+        if sheet_name in batch_tables:
+            sink.sheet(sheet_name).write_frame(rows.to_frame(engine.output_columns.get(sheet_name)))
+        elif not stream:
+            sink.sheet(sheet_name).extend(rows)
+    written = sink.close()
+    for sheet_name in sorted(written):
+        print(f"  Written {written[sheet_name]} rows to {sheet_name}")
+
     print(f"\n✅ Success! {measure_name} Mockup generated at {output_path}")
     return output_path
 
@@ -410,44 +506,37 @@ if __name__ == "__main__":
     parser.add_argument('--model', default='qwen2:0.5b', help='Ollama model name')
     parser.add_argument('--skip-quality-check', action='store_true', help='Skip quality checks')
     parser.add_argument('--validate-ncqa', action='store_true', help='Validate NCQA compliance')
-    parser.add_argument('--depth', choices=['population', 'scenario'], default='population', help='Mocking depth: full population data or only explicit scenario events')
+    parser.add_argument('--depth', choices=['population', 'scenario', 'volume'], default='population', help='Mocking depth: full population data, only explicit scenario events, or --volume members per scenario')
+    parser.add_argument('--volume', type=int, default=100, help='Members per scenario for --depth volume (default: 100)')
     parser.add_argument('--scope', choices=['all', 'mandatory'], default='all', help='Column scope: all fields (including rich metadata) or only mandatory/compliance fields')
+    parser.add_argument('--batch', action='store_true', help='Columnar batch generation (vectorized; for large populations)')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for scenario generation (default: 1, serial)')
+    parser.add_argument('--jobs', type=int, default=1, help='Measures generated in parallel when several are given (default: 1, one after another)')
+    parser.add_argument('--seed', type=_seed_arg, help='Run seed (0 to 2^64-1): identical inputs and seed reproduce identical output')
+    parser.add_argument('--reuse-templates', action='store_true', help='Generate structurally identical scenarios once and copy them with new member/claim IDs')
+    parser.add_argument('--format', choices=['xlsx', 'csv', 'parquet', 'sqlite'], help='Output format (default: xlsx; csv for --depth volume). csv/parquet write one file per table')
+    parser.add_argument('--no-cache', action='store_true', help='Always regenerate, even if an identical seeded run is in the output cache')
     
     args = parser.parse_args()
     measures = [m.strip() for m in args.measures.split(',')]
     vsd_path = args.vsd if args.vsd else os.getenv('VSD_PATH', 'data/VSD_MY2026.xlsx')
-    data_dir = os.getenv('DATA_DIR', 'data')
     
     print(f"🚀 Starting HEDIS Mockup Generation for: {', '.join(measures)}")
-    testcase_dir = os.getenv('TESTCASE_DIR', data_dir)
-    
-    for measure in measures:
-        tc_default = os.path.join(testcase_dir, f'{measure}_MY2026_TestCase.xlsx')
-        tc_path = args.testcase if args.testcase else tc_default
-        
-        if not os.path.exists(tc_path) and not args.testcase:
-            if os.path.exists(measure):
-                tc_path = measure
-                measure = os.path.basename(measure).split('_')[0].upper()
-            else:
-                try:
-                    candidates = [f for f in os.listdir(testcase_dir) if f.upper().startswith(measure.upper()) and f.endswith(('.xlsx', '.csv'))]
-                    if candidates:
-                        tc_path = os.path.join(testcase_dir, candidates[0])
-                        print(f"🔍 Auto-detected test case: {tc_path}")
-                except:
-                    pass
-
-        if not os.path.exists(tc_path) and not args.testcase:
-            standard_path = os.path.join(data_dir, f'{measure}_STANDARD.xlsx')
-            if os.path.exists(standard_path): tc_path = standard_path
-
-        run_measure_gen_custom(
-            measure, tc_path, vsd_path, 
-            disable_ai=args.no_ai, 
-            model_name=args.model,
-            skip_quality_check=args.skip_quality_check,
-            validate_ncqa=args.validate_ncqa,
-            mocking_depth=args.depth,
-            column_scope=args.scope
-        )
+    run_measures(
+        measures, vsd_path,
+        jobs=args.jobs,
+        testcase=args.testcase,
+        disable_ai=args.no_ai, 
+        model_name=args.model,
+        skip_quality_check=args.skip_quality_check,
+        validate_ncqa=args.validate_ncqa,
+        mocking_depth=args.depth,
+        column_scope=args.scope,
+        batch=args.batch,
+        workers=args.workers,
+        seed=args.seed,
+        reuse_templates=args.reuse_templates,
+        volume_size=args.volume,
+        output_format=args.format,
+        use_cache=not args.no_cache
+    )
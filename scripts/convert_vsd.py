@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.vsd import stream_vsd_rows, NORMALIZED_COLUMNS
+
+def convert(source_path, output_path):
+    """
+    Converts the official NCQA VSD workbook (or a CSV export) into a normalised
+    Parquet/CSV file with the columns VSDManager expects.
+    Point VSD_PATH at the output to skip xlsx parsing entirely.
+    """
+    if not os.path.exists(source_path):
+        print(f"Error: {source_path} not found.")
+        return None
+
+    start = time.time()
+    print(f"Reading {source_path}...")
+    df = pd.DataFrame.from_records(stream_vsd_rows(source_path), columns=NORMALIZED_COLUMNS)
+    for col in ['Effective Date', 'Expiration Date']:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    df['Code System'] = df['Code System'].fillna('Unknown')
+    print(f"Normalised {len(df)} codes across {df['Value Set Name'].nunique()} value sets.")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    if output_path.lower().endswith('.csv'):
+        df.to_csv(output_path, index=False, date_format='%Y-%m-%d')
+    else:
+        df.to_parquet(output_path, index=False)
+
+    print(f"✅ Saved {output_path} in {time.time() - start:.1f}s")
+    print(f"   Set VSD_PATH={output_path} to use it.")
+    return output_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert an NCQA VSD workbook to Parquet or CSV')
+    parser.add_argument('source', help='Path to the VSD .xlsx (or .csv)')
+    parser.add_argument('output', nargs='?', help='Output path (.parquet or .csv). Defaults to <source>.parquet')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.source)[0] + '.parquet'
+    convert(args.source, output)
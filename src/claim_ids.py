@@ -0,0 +1,32 @@
+class ClaimIdAllocator:
+    """
+    Monotonic claim numbers handed out in fixed-size shards.
+    Shard k owns [base + k * shard_size, base + (k + 1) * shard_size). The engine opens
+    one shard per scenario (by its position in the scenario list), so numbers depend only
+    on scenario order - never on which worker, chunk or generation mode produced the row -
+    and no two claims in a run can collide.
+    """
+    __slots__ = ('base', 'shard_size', 'shard', '_next', '_end')
+
+    def __init__(self, base=1, shard_size=1000):
+        self.base = base
+        self.shard_size = shard_size
+        self.shard = -1
+        self._next = self._end = base
+
+    def open_shard(self, index=None):
+        """Starts handing out numbers from shard `index` (default: the shard after the current one)."""
+        self.shard = self.shard + 1 if index is None else index
+        self._next = self.shard_start(self.shard)
+        self._end = self._next + self.shard_size
+
+    def shard_start(self, index):
+        """First number of shard `index` (vectorizes: works on NumPy index arrays too)."""
+        return self.base + index * self.shard_size
+
+    def next(self):
+        if self._next >= self._end:
+            raise OverflowError(f"Claim ID shard {self.shard} exhausted ({self.shard_size} claims); raise shard_size")
+        n = self._next
+        self._next += 1
+        return n
@@ -0,0 +1,135 @@
+import hashlib
+import numpy as np
+from functools import lru_cache
+from faker import Faker
+
+# splitmix64 constants
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+LETTERS = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'), dtype=object)
+DIGITS = np.array(list('0123456789'), dtype=object)
+MBI_LAYOUT = '?#??-?#?-?#??'
+
+_MASK = (1 << 64) - 1
+
+def stable_hash(mem_id):
+    """Stable 64-bit hash of a member ID (unlike hash(), identical across processes and runs)."""
+    return int.from_bytes(hashlib.blake2b(str(mem_id).encode('utf-8'), digest_size=8).digest(), 'little')
+
+def member_hash(mem_ids):
+    return np.array([stable_hash(m) for m in mem_ids], dtype=np.uint64)
+
+def _mix(h, salt):
+    """Independent pseudo-random stream `salt` derived from hashes h (vectorized splitmix64)."""
+    with np.errstate(over='ignore'):
+        z = h + np.uint64(salt + 1) * _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * _MIX1
+        z = (z ^ (z >> np.uint64(27))) * _MIX2
+        return z ^ (z >> np.uint64(31))
+
+def _mix_int(h, salt):
+    """Scalar _mix on Python ints (same values, no array overhead)."""
+    z = (h + (salt + 1) * 0x9E3779B97F4A7C15) & _MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
+
+class DemographicPool:
+    """
+    Pregenerated, seedable member demographics.
+    Names (by gender) and addresses are drawn from Faker once into fixed-size pools;
+    each member picks entries by a stable hash of its ID, and SSN/HIC/MBI are derived
+    from the same hash. Same (seed, member ID) -> same demographics, at array-lookup speed.
+    """
+
+    def __init__(self, size=1024, seed=0):
+        self.size = size
+        self.seed = seed
+        fake = Faker()
+        fake.seed_instance(seed)
+
+        def pool(method):
+            return np.array([method() for _ in range(size)], dtype=object)
+
+        self.first_female = pool(fake.first_name_female)
+        self.first_male = pool(fake.first_name_male)
+        self.last = pool(fake.last_name)
+        self.middle = np.array([name[0] for name in pool(fake.first_name)], dtype=object)
+        self.addr1 = pool(fake.street_address)
+        self.city = pool(fake.city)
+        self.state = pool(fake.state_abbr)
+        self.zip = pool(fake.zipcode)
+
+    def draw(self, mem_ids, female):
+        """
+        Demographics for many members at once.
+        Returns {field: object array} keyed by schema_map member field names.
+        """
+        h = member_hash(mem_ids) ^ np.uint64(self.seed)
+        female = np.asarray(female, dtype=bool)
+        size = np.uint64(self.size)
+
+        def pick(values, salt):
+            return values[(_mix(h, salt) % size).astype(np.int64)]
+
+        def below(n, salt):
+            return (_mix(h, salt) % np.uint64(n)).astype(np.int64)
+
+        area = below(899, 10) + 1
+        area[area == 666] = 667
+        ssn = [f"{a:03d}-{g:02d}-{s:04d}" for a, g, s in zip(area.tolist(), (below(99, 11) + 1).tolist(), (below(9999, 12) + 1).tolist())]
+        hic = [f"{x}A" for x in below(10**9, 13).tolist()]
+
+        mbi = np.full(len(h), '', dtype=object)
+        for pos, ch in enumerate(MBI_LAYOUT):
+            if ch == '?':
+                mbi = mbi + LETTERS[below(26, 20 + pos)]
+            elif ch == '#':
+                mbi = mbi + DIGITS[below(10, 20 + pos)]
+            else:
+                mbi = mbi + ch
+
+        return {
+            'first_name': np.where(female, pick(self.first_female, 0), pick(self.first_male, 1)),
+            'last_name': pick(self.last, 2),
+            'middle_name': pick(self.middle, 3),
+            'addr1': pick(self.addr1, 4),
+            'city': pick(self.city, 5),
+            'state': pick(self.state, 6),
+            'zip': pick(self.zip, 7),
+            'ssn': np.array(ssn, dtype=object),
+            'hic': np.array(hic, dtype=object),
+            'mbi': mbi,
+        }
+
+    def member(self, mem_id, female):
+        """Demographics for one member, identical to its row in draw()."""
+        h = stable_hash(mem_id) ^ self.seed
+
+        def below(n, salt):
+            return _mix_int(h, salt) % n
+
+        area = below(899, 10) + 1
+        if area == 666:
+            area = 667
+        mbi = ''.join(LETTERS[below(26, 20 + pos)] if ch == '?' else DIGITS[below(10, 20 + pos)] if ch == '#' else ch
+                      for pos, ch in enumerate(MBI_LAYOUT))
+        return {
+            'first_name': self.first_female[below(self.size, 0)] if female else self.first_male[below(self.size, 1)],
+            'last_name': self.last[below(self.size, 2)],
+            'middle_name': self.middle[below(self.size, 3)],
+            'addr1': self.addr1[below(self.size, 4)],
+            'city': self.city[below(self.size, 5)],
+            'state': self.state[below(self.size, 6)],
+            'zip': self.zip[below(self.size, 7)],
+            'ssn': f"{area:03d}-{below(99, 11) + 1:02d}-{below(9999, 12) + 1:04d}",
+            'hic': f"{below(10**9, 13)}A",
+            'mbi': mbi,
+        }
+
+@lru_cache(maxsize=8)
+def get_pool(size=1024, seed=0):
+    """Process-wide pool per (size, seed): built once, shared by every engine."""
+    return DemographicPool(size=size, seed=seed)
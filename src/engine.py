@@ -2,12 +2,122 @@ import yaml
 import re
 import os
 import json
+import random
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from faker import Faker
+from functools import lru_cache
+from src.demographics import get_pool
+from src.schema_layout import compile_layouts, resolve_output_columns
+from src.claim_ids import ClaimIdAllocator
+
+# Comprehensive Default flags and Identifiers based on user image
+ENROLLMENT_DEFAULTS = {
+    'BEN_MEDICAL': 1,
+    'BEN_MED_INP': 1,
+    'BEN_MED_INT': 1,
+    'BEN_MED_AMB': 1,
+    'BEN_DENT': 0,
+    'BEN_RX': 1,
+    'BEN_MH_INP': 1,
+    'BEN_MH_INT': 1,
+    'BEN_MH_AMB': 1,
+    'BEN_CD_INP': 1,
+    'BEN_CD_INT': 1,
+    'BEN_CD_AMB': 1,
+    'BEN_HOSPICE': 0,
+    'BEN_ESRD': 0,
+    'BEN_OS': 0,
+    'EMLS_ESCL_FL': 0,
+    'SCH_ID': "K10",
+    'GRP_ID': "1",
+    'IP_EMPLOYER': "X",
+    'EMP_ID': "K10",
+    'MED_ORG_EXT_ID': "51",
+    'COVERAGE_INDICATOR': "C",
+    'PBP_NBR': "001",
+    'SUB_TYPE': "",
+    'ASO_IND': "",
+    'CMS_NUMBER': "H0123"
+}
+
+# Member fields drawn from the DemographicPool, in member row order
+DEMOGRAPHIC_FIELDS = ('first_name', 'last_name', 'middle_name', 'addr1', 'city', 'state', 'zip', 'ssn', 'hic', 'mbi')
+
+# M/D/YYYY or M/D/MY, MY-n, MY+n (n = 1..9), lower-cased
+MY_DATE_PATTERN = re.compile(r'^(\d{1,2})/(\d{1,2})/(?:(\d{4})|my(?:([+-])([1-9]))?)$')
+
+# Monthly enrollment flags: FLD00 = Jan MY-1 ... FLD23 = Dec MY
+FLD_COLUMNS = tuple(f"FLD{i:02d}" for i in range(24))
+
+# Scenario fields that shape generated rows (everything the engine reads except the member ID)
+TEMPLATE_FIELDS = ('age', 'gender', 'product_line', 'enrollment_spans', 'visit_spans', 'compliant',
+                   'excluded', 'overrides', 'monthly_overrides', 'event_date_override', 'date_shift')
+
+# Run seeds feed numpy generators and 64-bit demographic hashes: 0 .. 2**64 - 1
+MAX_SEED = 2**64 - 1
+
+def check_seed(seed):
+    """Returns seed (None = unseeded) if it is a valid run seed, else raises ValueError."""
+    if seed is not None and not 0 <= seed <= MAX_SEED:
+        raise ValueError(f"Seed must be between 0 and {MAX_SEED}, got {seed}")
+    return seed
+
+def parse_seed(text):
+    """Run seed from user text ('' = unseeded): ASCII digits only, then range-checked."""
+    text = str(text).strip()
+    if not text:
+        return None
+    # str.isdigit() also accepts digits such as '²' that int() rejects
+    if not (text.isascii() and text.isdigit()):
+        raise ValueError(f"Seed must be a whole number between 0 and {MAX_SEED}, got {text!r}")
+    return check_seed(int(text))
+
+def _canonical(value):
+    """Order-independent, hashable form of parsed scenario data (dict keys may mix types)."""
+    if isinstance(value, dict):
+        return tuple(sorted((repr(k), _canonical(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical(v) for v in value)
+    return repr(value)
+
+def _normalize_event_overrides(overrides):
+    """Ensures per-event override metadata is a list (one entry per event instance), in place."""
+    if 'events' in overrides:
+        for k, v in overrides['events'].items():
+            if isinstance(v, dict):
+                overrides['events'][k] = [v]
+
+def scenario_key(sc):
+    """Structural key of a parsed scenario: equal for scenarios that differ only in member ID."""
+    _normalize_event_overrides(sc.get('overrides') or {})
+    return repr(tuple(_canonical(sc.get(f)) for f in TEMPLATE_FIELDS))
+
+@lru_cache(maxsize=None)
+def load_medication_codes(path):
+    """HEDIS medication code overrides (NDC/RxNorm), parsed once per process and shared read-only."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class ComponentPlan:
+    """
+    A measure component resolved once per engine: target table, value sets,
+    code routing columns and days-supply/quantity defaults.
+    """
+    __slots__ = ('component', 'table_key', 'layout', 'value_sets', 'composite', 'days_supply',
+                 'quantity', 'code_column', 'fallback_code_column', 'log_vs_name')
+
+    def __init__(self, **kwargs):
+        for name in self.__slots__:
+            setattr(self, name, kwargs[name])
 
 class MockupEngine:
-    def __init__(self, measure_config_path, schema_path, vsd_manager=None, year=2026, measure_name_override=None, mocking_depth='population', column_scope='all'):
+    def __init__(self, measure_config_path, schema_path, vsd_manager=None, year=2026, measure_name_override=None, mocking_depth='population', column_scope='all', seed=None, reuse_templates=False, columns_path='data_columns_info.json'):
+        # Everything a worker process needs to rebuild this engine (see src/parallel.py)
+        self.spec = dict(measure_config_path=measure_config_path, schema_path=schema_path, year=year,
+                         measure_name_override=measure_name_override, mocking_depth=mocking_depth, column_scope=column_scope,
+                         reuse_templates=reuse_templates, columns_path=columns_path)
+        check_seed(seed)
         with open(measure_config_path, 'r') as f:
             self.measure = yaml.safe_load(f)
         
@@ -20,14 +130,53 @@ class MockupEngine:
             table_name = self.schema['tables'][table_key]['name']
             if '{MEASURE}' in table_name:
                 self.schema['tables'][table_key]['name'] = table_name.format(MEASURE=measure_name)
+        
+        # ⚡ Precompiled Layouts: resolve schema_map lookups once instead of per row
+        self.layouts = compile_layouts(self.schema)
+        self._member_row_columns = (self.layouts['member'].pk,) + self.layouts['member'].select('dob', 'gender', *DEMOGRAPHIC_FIELDS)
+        self._layouts_by_name = {layout.name: layout for layout in self.layouts.values()}
+        # Columns filled from the claim ID allocator (visit rows are keyed by their claim)
+        self._claim_columns = {layout.name: tuple(c for c in (layout.pk if key == 'visit' else None, layout.fields.get('claim_id')) if c)
+                               for key, layout in self.layouts.items()}
+        # ⚡ Output column order per table (data_columns_info.json, prefix-independent fallbacks), resolved once
+        self.column_schema = {}
+        if columns_path and os.path.exists(columns_path):
+            with open(columns_path, 'r') as f:
+                self.column_schema = json.load(f)
+        self.output_columns = resolve_output_columns(self._layouts_by_name, self.column_schema)
                 
         self.year = year
-        self.fake = Faker()
+        self._parse_date_cached = lru_cache(maxsize=4096)(self._parse_date_expr)
+        # Month starts matching FLD_COLUMNS
+        self._fld_months = [datetime(year + (i // 12) - 1, (i % 12) + 1, 1) for i in range(24)]
+        # ⚡ Deterministic demographic pool (shared per process); a run seed reseeds its Faker draws
+        self.demographics = get_pool(seed=seed if seed is not None else 0)
         self.vsd_manager = vsd_manager
+        
+        # ⚡ Precompiled component resolution (see generate_clinical_event)
+        clinical_events = self.measure['rules']['clinical_events']
+        self.component_plans = self._compile_component_plans()
+        self._forced_plans = {}
+        self._numerator_index = {}
+        for i, c in enumerate(clinical_events.get('numerator_components') or []):
+            self._numerator_index.setdefault(c['name'], i)
+        self._denominator_names = [c['name'] for c in clinical_events.get('denominator_components') or []]
         self.mocking_depth = mocking_depth
         self.column_scope = column_scope
+
+        # ⚡ Per-member RNG streams: each member's draws depend only on (seed, member ID),
+        # so scenarios can be generated in any order or process with identical output
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.seeded = seed is not None
+        self.rng = random.Random(self.seed)
+        self.spec['seed'] = self.seed
+        # ⚡ Claim IDs: one shard of claim numbers per scenario (unique and mode-independent)
+        self.claim_ids = ClaimIdAllocator()
+        # ⚡ Scenario templates: structurally identical scenarios are generated once, then stamped
+        self.reuse_templates = reuse_templates
+        self._templates = {}
         
-        print(f"MockupEngine initialized for {measure_name} (MY {year}) | Depth={mocking_depth}, Scope={column_scope}")
+        print(f"MockupEngine initialized for {measure_name} (MY {year}) | Depth={mocking_depth}, Scope={column_scope}, Seed={self.seed}")
         
         # ⚡ Professional Config: Load Product Line IDs from file
         product_config_path = os.path.join(os.path.dirname(measure_config_path), 'products.yaml')
@@ -49,8 +198,7 @@ class MockupEngine:
         self.medication_codes = {}
         med_codes_path = os.path.join(os.getcwd(), 'data', 'HEDIS_Medication_Codes.json')
         if os.path.exists(med_codes_path):
-            with open(med_codes_path, 'r') as f:
-                self.medication_codes = json.load(f)
+            self.medication_codes = load_medication_codes(med_codes_path)
             print(f"  🎯 Loaded {len(self.medication_codes)} HEDIS Medication Value Sets for code overrides.")
         
         # ⚡ Phase 4: Load File ID Mappings (Primary/Supplemental Source Compliance)
@@ -66,11 +214,23 @@ class MockupEngine:
                         self.file_ids[cat].append(item['FILE_ID'])
             print(f"  📂 Loaded {len(data['file_ids'])} File ID mappings for source compliance.")
 
+    def begin_member(self, mem_id, index=None, stream=None):
+        """
+        Switches to the member's own RNG stream (derived from the run seed and member ID,
+        or `stream` when given) and opens the claim ID shard of scenario `index`
+        (default: the next shard).
+        """
+        self.rng = random.Random(f"{self.seed}:{mem_id if stream is None else stream}")
+        self.claim_ids.open_shard(index)
+
+    def _claim_id(self, prefix, mem_id):
+        """Next claim ID from the current scenario's shard, e.g. RX_<member>_<claim number>."""
+        return f"{prefix}_{mem_id}_{self.claim_ids.next()}"
+
     def _get_random_file_id(self, category):
         """Returns a random FILE_ID for a given source category (e.g., VISIT_IN)."""
-        import random
         if category in self.file_ids:
-            return random.choice(self.file_ids[category])
+            return self.rng.choice(self.file_ids[category])
         return 90000 # Default fallback
 
     def calculate_birth_date(self, age):
@@ -125,35 +285,13 @@ class MockupEngine:
 
         dob = self.calculate_birth_date(age)
         
-        # Seed faker with member ID for deterministic output
-        self.fake.seed_instance(sum(ord(c) for c in mem_id))
-        
-        if gender == 'F':
-            fname = self.fake.first_name_female()
-        else:
-            fname = self.fake.first_name_male()
-            
-        lname = self.fake.last_name()
-        
-        res = {
-            self.schema['tables']['member']['pk']: mem_id,
-            self.schema['tables']['member']['fields']['dob']: dob,
-            self.schema['tables']['member']['fields']['gender']: gender,
-            self.schema['tables']['member']['fields']['first_name']: fname,
-            self.schema['tables']['member']['fields']['last_name']: lname,
-            self.schema['tables']['member']['fields']['middle_name']: self.fake.first_name()[0],
-            self.schema['tables']['member']['fields']['addr1']: self.fake.street_address(),
-            self.schema['tables']['member']['fields']['city']: self.fake.city(),
-            self.schema['tables']['member']['fields']['state']: self.fake.state_abbr(),
-            self.schema['tables']['member']['fields']['zip']: self.fake.zipcode(),
-            self.schema['tables']['member']['fields']['ssn']: self.fake.ssn(),
-            self.schema['tables']['member']['fields']['hic']: f"{self.fake.random_number(digits=9)}A",
-            self.schema['tables']['member']['fields']['mbi']: self.fake.bothify(text='?#??-?#?-?#??').upper()
-        }
+        # ⚡ Deterministic demographics: stable hash of the member ID into the pregenerated pool
+        demo = self.demographics.member(mem_id, gender == 'F')
+        res = dict(zip(self._member_row_columns, (mem_id, dob, gender) + tuple(demo[f] for f in DEMOGRAPHIC_FIELDS)))
         
         # ⚡ Source Compliance
-        if 'file_id' in self.schema['tables']['member']['fields']:
-            res[self.schema['tables']['member']['fields']['file_id']] = self._get_random_file_id('MEMBER_IN')
+        if 'file_id' in self.layouts['member'].fields:
+            res[self.layouts['member'].fields['file_id']] = self._get_random_file_id('MEMBER_IN')
         
         if overrides:
             for field, val in overrides.items():
@@ -166,9 +304,33 @@ class MockupEngine:
         # ⚡ Robustness: specific handle for non-string types (already dates)
         if hasattr(date_str, 'strftime'):
             return date_str
-            
-        date_str = str(date_str).lower().strip()
-        str_year = str(self.year)
+        
+        # ⚡ Memoized: the same handful of expressions repeats for every member
+        return self._parse_date_cached(str(date_str).lower().strip(), self.year)
+
+    def parse_dates(self, values):
+        """
+        Vectorized parse_date_str for a whole column of date expressions.
+        Each distinct value is parsed once; returns a DatetimeIndex aligned with `values`.
+        """
+        values = pd.Series(list(values), dtype=object)
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        parsed = [self.parse_date_str(v) for v in uniques]
+        return pd.DatetimeIndex(parsed)[codes]
+
+    def _parse_date_expr(self, date_str, year):
+        # ⚡ Compiled grammar for the common M/D/YYYY and M/D/MY[+-n] forms
+        m = MY_DATE_PATTERN.match(date_str)
+        if m:
+            month, day, literal_year, sign, offset = m.groups()
+            if literal_year:
+                y = int(literal_year)
+            else:
+                y = year + (int(offset) if sign == '+' else -int(offset)) if sign else year
+            try:
+                return pd.Timestamp(y, int(month), int(day))
+            except ValueError:
+                pass # Invalid day/month: same handling as the general path
         
         # Replace MY+/-offset
         if 'my' in date_str:
@@ -178,61 +340,28 @@ class MockupEngine:
                 parts = date_str.split('my-')
                 if len(parts) > 1 and len(parts[1]) > 0 and parts[1][0].isdigit():
                     offset = -int(parts[1][0])
-                    date_str = date_str.replace(f"my{offset}", str(self.year + offset))
+                    date_str = date_str.replace(f"my{offset}", str(year + offset))
             elif 'my+' in date_str:
                  parts = date_str.split('my+')
                  if len(parts) > 1 and len(parts[1]) > 0 and parts[1][0].isdigit():
                     offset = int(parts[1][0])
-                    date_str = date_str.replace(f"my+{offset}", str(self.year + offset))
+                    date_str = date_str.replace(f"my+{offset}", str(year + offset))
             
             # Simple replacement if logic above didn't fully catch it or plain MY
-            date_str = date_str.replace('my', str(self.year))
-            
-            # Clean up potential double operators if logic was loose
-            # (Keeping it simple for now)
+            date_str = date_str.replace('my', str(year))
         
         try:
             return pd.to_datetime(date_str)
         except:
-            return datetime(self.year, 1, 1)
+            return datetime(year, 1, 1)
 
     def generate_enrollments(self, mem_id, product_line="Medicare", spans=None, overrides=None):
-        target_table = self.schema['tables']['enrollment']
+        target_table = self.layouts['enrollment']
         rows = []
         
         product_id = self.pl_map.get(product_line, 1)
         
-        # Comprehensive Default flags and Identifiers based on user image
-        base_record = {
-            'BEN_MEDICAL': 1,
-            'BEN_MED_INP': 1,
-            'BEN_MED_INT': 1,
-            'BEN_MED_AMB': 1,
-            'BEN_DENT': 0,
-            'BEN_RX': 1,
-            'BEN_MH_INP': 1,
-            'BEN_MH_INT': 1,
-            'BEN_MH_AMB': 1,
-            'BEN_CD_INP': 1,
-            'BEN_CD_INT': 1,
-            'BEN_CD_AMB': 1,
-            'BEN_HOSPICE': 0,
-            'BEN_ESRD': 0,
-            'BEN_OS': 0,
-            'EMLS_ESCL_FL': 0,
-            'SCH_ID': "K10",
-            'GRP_ID': "1",
-            'IP_EMPLOYER': "X",
-            'EMP_ID': "K10",
-            'MED_ORG_EXT_ID': "51",
-            'COVERAGE_INDICATOR': "C",
-            'PBP_NBR': "001",
-            'SUB_TYPE': "",
-            'ASO_IND': "",
-            'CMS_NUMBER': "H0123",
-            'PRODUCT_ID': product_id,
-            'PRODUCT_ID_2': product_id
-        }
+        base_record = {**ENROLLMENT_DEFAULTS, 'PRODUCT_ID': product_id, 'PRODUCT_ID_2': product_id}
 
         # If no explicit spans, default to full measurement year
         if not spans:
@@ -246,17 +375,17 @@ class MockupEngine:
             final_pid = int(p_id) if (p_id and str(p_id).isdigit()) else product_id
 
             row = {
-                target_table['pk']: mem_id,
-                target_table['fields']['start_date']: start_dt,
-                target_table['fields']['end_date']: end_dt,
+                target_table.pk: mem_id,
+                target_table.fields['start_date']: start_dt,
+                target_table.fields['end_date']: end_dt,
                 **base_record,
                 'PRODUCT_ID': final_pid,
                 'PRODUCT_ID_2': final_pid
             }
 
             # ⚡ Source Compliance
-            if 'file_id' in target_table['fields']:
-                row[target_table['fields']['file_id']] = self._get_random_file_id('ENROLLMENT_IN')
+            if 'file_id' in target_table.fields:
+                row[target_table.fields['file_id']] = self._get_random_file_id('ENROLLMENT_IN')
 
             # 1. Apply Global Overrides (Generic matches)
             if overrides:
@@ -266,7 +395,7 @@ class MockupEngine:
                         row[f] = v
                     else:
                         # Try to find if it matches a mapped column
-                        mapped_col = next((col for logic, col in target_table['fields'].items() if f == logic or f == col), None)
+                        mapped_col = target_table.resolve(f)
                         if mapped_col: row[mapped_col] = v
             
             # 2. Apply Span-specific overrides (Specific takes precedence)
@@ -278,11 +407,7 @@ class MockupEngine:
 
             # Calculate FLD00 - FLD23 (24 months: MY-1 and MY)
             # FLD00 = Jan MY-1, FLD12 = Jan MY
-            for i in range(24):
-                year_off = (i // 12) - 1 # -1 for first 12, 0 for second 12
-                month = (i % 12) + 1
-                target_month_start = datetime(self.year + year_off, month, 1)
-                
+            for fld, target_month_start in zip(FLD_COLUMNS, self._fld_months):
                 # Check if enrolled this month (at least one day)
                 # Enrolled if start_dt <= last_day_of_month and end_dt >= first_day_of_month
                 # For simplicity, check if target_month_start is within range or same month
@@ -292,24 +417,24 @@ class MockupEngine:
                 elif start_dt.year == target_month_start.year and start_dt.month == target_month_start.month:
                     is_enrolled = 1
                 
-                row[f"FLD{i:02d}"] = is_enrolled
+                row[fld] = is_enrolled
 
             rows.append(row)
         
         return rows
 
-    def generate_visits(self, mem_id, spans=None, overrides=None, product_line='COMMERCIAL'):
-        target_table = self.schema['tables']['visit']
+    def generate_visits(self, mem_id, spans=None, overrides=None, product_line='COMMERCIAL', date_shift=0):
+        target_table = self.layouts['visit']
         rows = []
         
         # If no explicit spans
         if not spans:
             if self.mocking_depth == 'scenario':
                 # Skip default/random visit for cleaner "scenario-only" output
-                return target_table['name'], []
+                return target_table.name, []
             else:
-                # Default "population" behavior: always has one visit
-                spans = [{'date': datetime(self.year, 2, 1), 'type': 'Outpatient'}]
+                # Default "population" behavior: always has one visit (moved by a volume variant's shift)
+                spans = [{'date': datetime(self.year, 2, 1) + timedelta(days=date_shift), 'type': 'Outpatient'}]
             
         for i, v in enumerate(spans):
             d = self.parse_date_str(v['date'])
@@ -362,7 +487,7 @@ class MockupEngine:
                     if candidates:
                         # Pick random value set, then random code
                         vs_name = candidates[0] 
-                        code = self.vsd_manager.get_random_code(vs_name)
+                        code = self.vsd_manager.get_random_code(vs_name, year=self.year, rng=self.rng)
                         if code:
                             resolved_code = code
                             resolved_system = self.vsd_manager.get_code_system(code)
@@ -380,14 +505,14 @@ class MockupEngine:
             # Always try to get a relevant diagnosis code if we don't have one yet
             # (Or if the resolved code was a Procedure, we still need a Diag)
             if diag_code == "Z00.00" and self.vsd_manager:
-                 vsd_diag = self.vsd_manager.get_random_code_from_pattern("Diagnosis")
+                 vsd_diag = self.vsd_manager.get_random_code_from_pattern("Diagnosis", year=self.year, rng=self.rng)
                  if vsd_diag: diag_code = vsd_diag
 
             row_data = {
-                target_table['fk']: mem_id,
-                target_table['pk']: f"C_{mem_id}_{i+1:02d}",
-                target_table['fields']['date']: d,
-                target_table['fields']['pos']: pos_code,
+                target_table.fk: mem_id,
+                target_table.pk: self._claim_id('C', mem_id),
+                target_table.fields['date']: d,
+                target_table.fields['pos']: pos_code,
                 "CPT_1": cpt_code,
                 "DIAG_I_1": diag_code
             }
@@ -406,8 +531,8 @@ class MockupEngine:
                         if k in row_data:
                             row_data[k] = v
                         # 2. Check if key matches a logical field name (e.g. 'pos' -> 'POS')
-                        elif k.lower() in target_table['fields']:
-                            phy_col = target_table['fields'][k.lower()]
+                        elif k.lower() in target_table.fields:
+                            phy_col = target_table.fields[k.lower()]
                             row_data[phy_col] = v
                         # 3. Fallback: Upper case key matches physical column?
                         elif k.upper() in row_data:
@@ -423,7 +548,7 @@ class MockupEngine:
 
             rows.append(row_data)
         
-        return target_table['name'], rows
+        return target_table.name, rows
 
     def generate_composite_event(self, mem_id, component_config, base_date, overrides=None, product_line='COMMERCIAL'):
         """
@@ -479,7 +604,6 @@ class MockupEngine:
         Checks for high-fidelity medication codes preprocessed from HEDIS Excel.
         """
         if value_set_name in self.medication_codes:
-            import random
             codes_config = self.medication_codes[value_set_name]
             
             # Decide which code system to use based on target table
@@ -491,75 +615,114 @@ class MockupEngine:
                 codes = codes_config.get('RxNorm', [])
             
             if codes:
-                return random.choice(codes)
+                return self.rng.choice(codes)
         
         return None
 
+    def _compile_component_plans(self):
+        """Component name -> ComponentPlan for every configured numerator/denominator component."""
+        events = self.measure['rules']['clinical_events']
+        plans = {}
+        # Numerator components take precedence over same-named denominator components
+        for c in reversed(events.get('denominator_components') or []):
+            plans[c['name']] = self._make_plan(c['name'], c, c['table'], composite=c.get('count', 1) > 1 or bool(c.get('events')))
+        for c in reversed(events.get('numerator_components') or []):
+            plans[c['name']] = self._make_plan(c['name'], c, c['table'])
+        return plans
+
+    def _compile_plan(self, component_name):
+        """Plan for a component the measure config does not define (cached on first use)."""
+        # ⚡ Universal Support: Smart-default table based on name
+        table_key = 'visit'
+        if "BMI" in component_name or "Weight" in component_name:
+            table_key = 'emr'
+        elif "PSA" in component_name or "Lab" in component_name:
+            table_key = 'lab'
+        elif "Medication" in component_name or "Drug" in component_name or "Rx" in component_name:
+            table_key = 'rx'
+            
+        # Create a dummy component for logic below
+        component = {
+            'name': component_name,
+            'table': table_key,
+            'value_set_names': [component_name] # Fallback
+        }
+        plan = self.component_plans[component_name] = self._make_plan(component_name, component, table_key)
+        return plan
+
+    def _forced_plan(self, component_name, table_key, vs_names, diag_pattern):
+        key = (component_name, table_key, vs_names, diag_pattern)
+        plan = self._forced_plans.get(key)
+        if plan is None:
+            # Create dummy component config
+            component = {
+                'name': component_name,
+                'table': table_key,
+                'value_set_names': list(vs_names),
+                'diagnosis_pattern': diag_pattern
+            }
+            # Use first VS name for logging
+            plan = self._forced_plans[key] = self._make_plan(component_name, component, table_key, log_vs_name=vs_names[0] if vs_names else None)
+        return plan
+
+    def _resolve_table_key(self, table_key):
+        if table_key in self.layouts:
+            return table_key
+        # Fallback for old configs that might still use [MEASURE]_...
+        measure_prefix = f"{self.measure.get('measure_name', 'PSA')}_"
+        table_raw = table_key.replace(measure_prefix, '').replace('_IN', '').lower()
+        if 'VISIT' in table_raw.upper(): return 'visit'
+        elif 'EMR' in table_raw.upper(): return 'emr'
+        elif 'LAB' in table_raw.upper(): return 'lab'
+        elif 'RX' in table_raw.upper() or 'PHARM' in table_raw.upper(): return 'rx'
+        return 'visit'
+
+    def _make_plan(self, component_name, component, table_key, composite=False, log_vs_name=None):
+        table_key = self._resolve_table_key(table_key)
+        layout = self.layouts[table_key]
+
+        # ⚡ Smart Adherence: detect maintenance meds
+        is_maintenance = any(kw in component_name.lower() or kw in str(log_vs_name).lower() for kw in ['statin', 'maintenance', 'adherence'])
+        default_days = 90 if is_maintenance else 30
+        days_supply = component.get('days_supply', default_days)
+
+        code_column = None
+        if table_key == 'lab':
+            code_column = layout.fields.get('cpt')
+        elif table_key == 'rx':
+            code_column = layout.fields.get('ndc')
+        return ComponentPlan(
+            component=component,
+            table_key=table_key,
+            layout=layout,
+            value_sets=component.get('value_set_names') or [],
+            composite=composite,
+            days_supply=days_supply,
+            quantity=component.get('quantity', days_supply),
+            code_column=code_column,
+            fallback_code_column=layout.fields.get('procedure_codes', [layout.fields.get('cpt', 'CPT_1')])[0],
+            log_vs_name=log_vs_name,
+        )
+
     def generate_clinical_event(self, mem_id, component_name, is_compliant=True, offset_days=0, overrides=None, product_line='COMMERCIAL'):
-        # Locate component in measure config
-        vs_name = None
-        
         # ⚡ Composite Override Support (Priority 1)
         if overrides and 'force_table' in overrides:
-             table_key = overrides['force_table']
-             # Create dummy component config
-             component = {
-                 'name': component_name,
-                 'table': table_key,
-                 'value_set_names': overrides.get('force_vs_names', []),
-                 'diagnosis_pattern': overrides.get('force_diag_pattern')
-             }
-             if overrides.get('force_vs_names'):
-                 vs_name = overrides['force_vs_names'][0] # Use first VS name for logging
+             plan = self._forced_plan(component_name, overrides['force_table'], tuple(overrides.get('force_vs_names') or ()), overrides.get('force_diag_pattern'))
         else:
-            # Check Numerator Components (Standard)
-            component = next((c for c in self.measure['rules']['clinical_events']['numerator_components'] if c['name'] == component_name), None)
-            
-            # Check Denominator Components (New for Complex Measures)
-            if not component and 'denominator_components' in self.measure['rules']['clinical_events']:
-                 component = next((c for c in self.measure['rules']['clinical_events']['denominator_components'] if c['name'] == component_name), None)
-                 if component:
-                     # If found in denominator list, check if it's complex
-                     if component.get('count', 1) > 1 or component.get('events'):
-                         return self.generate_composite_event(mem_id, component, datetime(self.year, 1, 1), overrides, product_line)
-
-            if component:
-                table_key = component['table'] # e.g. "lab", "visit"
-            else:
-                # ⚡ Universal Support: Smart-default table based on name
-                table_key = 'visit'
-                if "BMI" in component_name or "Weight" in component_name:
-                    table_key = 'emr'
-                elif "PSA" in component_name or "Lab" in component_name:
-                    table_key = 'lab'
-                elif "Medication" in component_name or "Drug" in component_name or "Rx" in component_name:
-                    table_key = 'rx'
-                    
-                # Create a dummy component for logic below
-                component = {
-                    'name': component_name,
-                    'table': table_key,
-                    'value_set_names': [component_name] # Fallback
-                }
+            # ⚡ Precompiled component table: one lookup instead of scanning the measure config
+            plan = self.component_plans.get(component_name) or self._compile_plan(component_name)
+            if plan.composite:
+                return self.generate_composite_event(mem_id, plan.component, datetime(self.year, 1, 1) + timedelta(days=offset_days), overrides, product_line)
 
-        if table_key not in self.schema['tables']:
-            # Fallback for old configs that might still use [MEASURE]_...
-            measure_prefix = f"{self.measure.get('measure_name', 'PSA')}_"
-            table_raw = table_key.replace(measure_prefix, '').replace('_IN', '').lower()
-            if 'VISIT' in table_raw.upper(): table_key = 'visit'
-            elif 'EMR' in table_raw.upper(): table_key = 'emr'
-            elif 'LAB' in table_raw.upper(): table_key = 'lab'
-            elif 'RX' in table_raw.upper() or 'PHARM' in table_raw.upper(): table_key = 'rx'
-            else: table_key = 'visit'
-
-        target_table = self.schema['tables'][table_key]
+        component = plan.component
+        table_key = plan.table_key
+        target_table = plan.layout
+        vs_name = plan.log_vs_name
         event_date = datetime(self.year, 6, 1) + timedelta(days=offset_days)
         
         # ⚡ Apply Overrides from Scenario (Universal Format support)
         specific_code = None
         specific_value = None
-        specific_days = 30
-        specific_qty = 30
         
         # Priority 1: Specific metadata passed directly (for multi-event scenarios)
         meta = overrides.get('specific_metadata') if overrides else None
@@ -572,13 +735,8 @@ class MockupEngine:
                 meta = meta[0]
 
         # Priority 3: Component level defaults from YAML
-        if component:
-            # ⚡ Smart Adherence: detect maintenance meds
-            is_maintenance = any(kw in component_name.lower() or kw in str(vs_name).lower() for kw in ['statin', 'maintenance', 'adherence'])
-            default_days = 90 if is_maintenance else 30
-            
-            specific_days = component.get('days_supply', default_days)
-            specific_qty = component.get('quantity', specific_days)
+        specific_days = plan.days_supply
+        specific_qty = plan.quantity
 
         if meta:
             if 'date' in meta:
@@ -597,17 +755,16 @@ class MockupEngine:
 
         # ⚡ Randomized Lab Values Support
         if is_compliant and component.get('table') == 'lab' and 'value_range' in component:
-             import random
              low, high = component['value_range']
              # Format as float string if range contains floats
              if isinstance(low, float) or isinstance(high, float):
-                 specific_value = f"{random.uniform(low, high):.1f}"
+                 specific_value = f"{self.rng.uniform(low, high):.1f}"
              else:
-                 specific_value = str(random.randint(low, high))
+                 specific_value = str(self.rng.randint(low, high))
 
         row = {
-            target_table['fk'] if 'fk' in target_table else target_table['pk']: mem_id,
-            target_table['fields']['date']: event_date
+            target_table.id_column: mem_id,
+            target_table.fields['date']: event_date
         }
         
         if specific_code:
@@ -626,7 +783,7 @@ class MockupEngine:
                     vsd_code = override_code
                     print(f"   🎯 Using external master code override for {vs_name}: {vsd_code}")
                 else:
-                    vsd_code = self.vsd_manager.get_random_code(vs_name)
+                    vsd_code = self.vsd_manager.get_random_code(vs_name, year=self.year, rng=self.rng)
                 
                 row['_VALUE_SET_NAME'] = vs_name
             
@@ -637,7 +794,7 @@ class MockupEngine:
                 
                 # Use as main code if column exists
                 if table_key == 'lab':
-                    row[target_table['fields']['cpt']] = final_code
+                    row[plan.code_column] = final_code
                 elif table_key == 'visit':
                     # ⚡ Smart Code Routing: Diagnosis (ICD) vs Procedure (CPT/RxNorm)
                     code_system = self.vsd_manager.get_code_system(final_code) if self.vsd_manager else "Unknown"
@@ -646,11 +803,11 @@ class MockupEngine:
                     else:
                         row["CPT_1"] = final_code
                 elif table_key == 'rx':
-                    row[target_table['fields']['ndc']] = final_code
-                    row[target_table['fields']['days_supply']] = specific_days
-                    row[target_table['fields']['quantity']] = specific_qty
+                    row[plan.code_column] = final_code
+                    row[target_table.fields['days_supply']] = specific_days
+                    row[target_table.fields['quantity']] = specific_qty
                 elif table_key == 'lab':
-                    row[target_table['fields']['cpt']] = final_code if final_code else '80000'
+                    row[target_table.fields['cpt']] = final_code if final_code else '80000'
             else:
                 row['_CODE'] = 'MANUAL'
             
@@ -667,43 +824,41 @@ class MockupEngine:
 
             # Add a realistic diagnosis if it's a visit (Force it even if code wasn't found)
             if table_key == 'visit' and self.vsd_manager and not row.get("DIAG_I_1"):
-                diag = self.vsd_manager.get_random_code_from_pattern("Diagnosis")
+                diag = self.vsd_manager.get_random_code_from_pattern("Diagnosis", year=self.year, rng=self.rng)
                 if diag: row["DIAG_I_1"] = diag
             
             row['_VALUE_SET_NAME'] = vs_name if vs_name else 'MANUAL'
 
             # --- Measure-Specific Post-Processing ---
             if component_name == "BMI Percentile":
-                row[target_table['fields']['bmi_percentile']] = specific_value if specific_value is not None else 85
+                row[target_table.fields['bmi_percentile']] = specific_value if specific_value is not None else 85
             elif "Counseling" in component_name:
                 code = final_code if final_code else ('Z71.3' if "Nutrition" in component_name else 'Z71.89')
-                target_field = target_table['fields'].get('procedure_codes', ['CPT_1'])[0]
+                target_field = target_table.fields.get('procedure_codes', ['CPT_1'])[0]
                 row[target_field] = code
                 if not row.get('_CODE'): row['_CODE'] = code # Fallback
             elif component_name == "PSA Test" or table_key == 'lab':
                 # Use value_range if provided, else default
                 val = specific_value if specific_value is not None else ('1.0' if component_name == "PSA Test" else '0.1')
-                row[target_table['fields'].get('value', 'LAB_VALUE')] = val
-                row[target_table['fields'].get('cpt', 'LAB_CPT')] = final_code if final_code else '80000'
+                row[target_table.fields.get('value', 'LAB_VALUE')] = val
+                row[target_table.fields.get('cpt', 'LAB_CPT')] = final_code if final_code else '80000'
             elif final_code:
                 # Catch-all for other components if we found a code
-                code_field = target_table['fields'].get('procedure_codes', [target_table['fields'].get('cpt', 'CPT_1')])[0]
-                row[code_field] = final_code
+                row[plan.fallback_code_column] = final_code
         
             if overrides:
                 for f, v in overrides.items():
                     if f in row: row[f] = v
 
-        return target_table['name'], row
+        return target_table.name, row
 
     def _populate_rx_fields(self, row, target_table, mem_id, product_line='COMMERCIAL'):
         """Populates rich metadata for pharmacy claims using schema mapping."""
-        fields = target_table.get('fields', {})
-        import time
+        fields = target_table.fields
         
         # Claim Identity
         if 'claim_id' in fields:
-            row[fields['claim_id']] = f"RX_{mem_id}_{int(time.time())}"
+            row[fields['claim_id']] = self._claim_id('RX', mem_id)
         
         # Claim Indicators
         if 'claim_den' in fields: row[fields['claim_den']] = 'N'
@@ -726,45 +881,51 @@ class MockupEngine:
 
     def _populate_visit_fields(self, row, target_table, mem_id, product_line='COMMERCIAL'):
         """Populates rich metadata for medical visits (Claims, POS, NPIs)."""
-        fields = target_table.get('fields', {})
-        import time
+        fields = target_table.fields
         
         # Claim Identity
         if 'claim_id' in fields:
-            row[fields['claim_id']] = f"CL_{mem_id}_{int(time.time())}"
+            row[fields['claim_id']] = self._claim_id('CL', mem_id)
+        
+        row.update(self._visit_claim_defaults(fields, product_line))
+            
+        # Source Identity
+        if 'file_id' in fields:
+            row[fields['file_id']] = self._get_random_file_id('VISIT_IN')
+
+    def _visit_claim_defaults(self, fields, product_line='COMMERCIAL'):
+        """Constant claim metadata shared by row and batch visit generation."""
+        values = {}
         
         # Claim Status
-        if 'claim_status' in fields: row[fields['claim_status']] = 'P' # Paid
+        if 'claim_status' in fields: values[fields['claim_status']] = 'P' # Paid
         
         # Place of Service (Default to Office=11)
-        if 'pos' in fields: row[fields['pos']] = '11'
+        if 'pos' in fields: values[fields['pos']] = '11'
         
         # Provider Context
-        if 'prov_nbr' in fields: row[fields['prov_nbr']] = 'PROV789'
+        if 'prov_nbr' in fields: values[fields['prov_nbr']] = 'PROV789'
         # Match schema_map.yaml key 'provider_npi'
-        if 'provider_npi' in fields: row[fields['provider_npi']] = '1122334455'
-        elif 'prov_npi' in fields: row[fields['prov_npi']] = '1122334455' # Fallback
+        if 'provider_npi' in fields: values[fields['provider_npi']] = '1122334455'
+        elif 'prov_npi' in fields: values[fields['prov_npi']] = '1122334455' # Fallback
         
-        if 'tin' in fields: row[fields['tin']] = '99-8887776'
+        if 'tin' in fields: values[fields['tin']] = '99-8887776'
         
         # Product Context
         if 'product_id' in fields:
             prod_info = self.product_config.get(product_line.upper(), {})
-            row[fields['product_id']] = prod_info.get('id', product_line.upper())
-            
-        # Source Identity
-        if 'file_id' in fields:
-            row[fields['file_id']] = self._get_random_file_id('VISIT_IN')
+            values[fields['product_id']] = prod_info.get('id', product_line.upper())
+        return values
 
     def _populate_lab_fields(self, row, target_table, mem_id, product_line='COMMERCIAL'):
         """Populates rich metadata for lab results."""
-        fields = target_table.get('fields', {})
+        fields = target_table.fields
         if 'file_id' in fields:
             row[fields['file_id']] = self._get_random_file_id('LAB_IN')
 
     def _populate_emr_fields(self, row, target_table, mem_id, product_line='COMMERCIAL'):
         """Populates rich metadata for EMR/Clinical Observations."""
-        fields = target_table.get('fields', {})
+        fields = target_table.fields
         if 'file_id' in fields:
             row[fields['file_id']] = self._get_random_file_id('EMR_IN')
 
@@ -793,33 +954,33 @@ class MockupEngine:
         # Try to get code from VSD
         vsd_code = None
         if self.vsd_manager and exclusion.get('value_set_names'):
-            vsd_code = self.vsd_manager.get_random_code(exclusion['value_set_names'][0])
+            vsd_code = self.vsd_manager.get_random_code(exclusion['value_set_names'][0], year=self.year, rng=self.rng)
 
         if exclusion_name == "Hospice":
             # Per schema_map: monthly_membership table
-            target_table = self.schema['tables']['monthly_membership']
+            target_table = self.layouts['monthly_membership']
             row = {
-                target_table['fk']: mem_id,
-                target_table['fields']['run_date']: event_date,
-                target_table['fields']['hospice_flag']: 1 # Use numeric 1 for hospice
+                target_table.fk: mem_id,
+                target_table.fields['run_date']: event_date,
+                target_table.fields['hospice_flag']: 1 # Use numeric 1 for hospice
             }
-            if 'file_id' in target_table['fields']:
-                row[target_table['fields']['file_id']] = self._get_random_file_id('MONTHLY_MBR_IN')
+            if 'file_id' in target_table.fields:
+                row[target_table.fields['file_id']] = self._get_random_file_id('MONTHLY_MBR_IN')
             
             if overrides:
                 for f, v in overrides.items():
-                    if f in row or f == 'HOSPICE': row[target_table['fields']['hospice_flag']] = v
-            return target_table['name'], row
+                    if f in row or f == 'HOSPICE': row[target_table.fields['hospice_flag']] = v
+            return target_table.name, row
             
         # Default Catch-all for exclusions (Universal support)
-        target_table = self.schema['tables']['visit']
+        target_table = self.layouts['visit']
         code = vsd_code if vsd_code else 'Z00.00'
         row = {
-            target_table['fk']: mem_id,
-            target_table['fields']['date']: event_date,
-            target_table['fields']['diagnosis_codes'][0]: code
+            target_table.fk: mem_id,
+            target_table.fields['date']: event_date,
+            target_table.fields['diagnosis_codes'][0]: code
         }
-        return target_table['name'], row
+        return target_table.name, row
 
     def generate_monthly_membership(self, mem_id, monthly_overrides):
         """
@@ -829,7 +990,7 @@ class MockupEngine:
         if not monthly_overrides:
             return None, []
             
-        target_table = self.schema['tables']['monthly_membership']
+        target_table = self.layouts['monthly_membership']
         rows = []
         
         # Group by run_date to create one record per month if needed
@@ -838,13 +999,510 @@ class MockupEngine:
             rd = self.parse_date_str(entry['run_date'])
             if rd not in by_date:
                 by_date[rd] = {
-                    target_table['fk']: mem_id,
-                    target_table['fields']['run_date']: rd
+                    target_table.fk: mem_id,
+                    target_table.fields['run_date']: rd
                 }
             
             # Map logical field to physical column if possible
             field = entry['field']
-            mapped_col = target_table['fields'].get(field.lower(), field)
+            mapped_col = target_table.fields.get(field.lower(), field)
             by_date[rd][mapped_col] = entry['value']
             
-        return target_table['name'], list(by_date.values())
+        return target_table.name, list(by_date.values())
+
+    def generate_scenario_events(self, sc):
+        """
+        Compliance events (auto-injected denominator components first), exclusions and
+        monthly flags for one scenario. Returns a flat list of (table_name, row).
+        """
+        mem_id = sc['id']
+        overrides = sc.get('overrides', {})
+        product_line = sc.get('product_line', 'Commercial')
+        out = []
+
+        # ⚡ Unified Event Loop (Supports Multiple Events per Scenario)
+        _normalize_event_overrides(overrides)
+        
+        # Track generated counts per type to match metadata
+        gen_counts = {} 
+        
+        # ⚡ AUTO-INJECT DENOMINATOR COMPONENTS (For Multi-Step Measures)
+        # For complex measures like SMD, SPC, SPD: automatically generate identification events
+        # even if not explicitly in test case scenarios
+        # Only auto-add if not already in compliant list
+        auto_events = [name for name in self._denominator_names if name not in sc['compliant']]
+        
+        # Iterate through ALL compliant events + Auto-Injected Denominator Components
+        all_events = auto_events + sc['compliant']  # Denominator first, then numerator
+        for event_name in all_events:
+            # Get Component Config Index
+            comp_idx = self._numerator_index.get(event_name, -1)
+            
+            # Metadata Retrieval
+            specific_meta = {}
+            if 'events' in overrides and event_name in overrides['events']:
+                 meta_list = overrides['events'][event_name]
+                 current_count = gen_counts.get(event_name, 0)
+                 if current_count < len(meta_list):
+                     specific_meta = meta_list[current_count]
+            
+            # Legacy ED1/ED2 Support (Apply to first instance only)
+            if 'date' not in specific_meta and comp_idx != -1 and gen_counts.get(event_name, 0) == 0:
+                 legacy_date = overrides.get('events_by_index', {}).get(comp_idx + 1)
+                 if legacy_date:
+                     specific_meta['date'] = legacy_date
+            
+            # Global ED override (if still no date)
+            if 'date' not in specific_meta and sc.get("event_date_override"):
+                 specific_meta['date'] = sc.get("event_date_override")
+
+            # Generate (injecting specific_metadata for the new engine logic)
+            # We copy overrides to avoid polluting global state, but it's shallow copy of dict
+            call_overrides = overrides.copy()
+            call_overrides['specific_metadata'] = specific_meta
+            
+            result = self.generate_clinical_event(
+                mem_id, event_name, is_compliant=True, 
+                offset_days=sc.get('date_shift', 0),
+                overrides=call_overrides,
+                product_line=product_line
+            )
+            
+            # Smart Handler: Support both Single (Table, Row) and List [(Table, Row), ...]
+            out.extend(result if isinstance(result, list) else [result])
+            gen_counts[event_name] = gen_counts.get(event_name, 0) + 1
+
+        # Exclusion Events
+        for excl_name in sc['excluded']:
+            out.append(self.generate_exclusion(mem_id, excl_name, overrides=overrides))
+        
+        # Monthly Flags (Structured Overrides)
+        m_table, m_rows = self.generate_monthly_membership(mem_id, sc.get('monthly_overrides', []))
+        if m_table:
+            out.extend((m_table, row) for row in m_rows)
+        return out
+
+    def generate_scenario_rows(self, sc, index=None):
+        """
+        Every row for one scenario (member, enrollments, visits, events, exclusions,
+        monthly flags) as a flat list of (table_name, row), drawn from the member's own
+        RNG stream. `index` is the scenario's position in the run (its claim ID shard).
+        The serial loop and the process pool both generate through here.
+        """
+        if self.reuse_templates:
+            return self._template_rows(sc, index)
+        return self._scenario_rows(sc, index)
+
+    def _scenario_rows(self, sc, index=None, stream=None):
+        mem_id = sc['id']
+        overrides = sc.get('overrides', {})
+        self.begin_member(mem_id, index, stream)
+
+        out = [(self.layouts['member'].name, self.generate_member_base(mem_id, sc['age'], sc.get('gender', 'M'), overrides=overrides))]
+        enrollment_table = self.layouts['enrollment'].name
+        out.extend((enrollment_table, row) for row in self.generate_enrollments(
+            mem_id, sc.get('product_line', 'Medicare'), spans=sc.get('enrollment_spans'), overrides=overrides))
+        v_table, v_rows = self.generate_visits(mem_id, spans=sc.get('visit_spans'), overrides=overrides, product_line=sc.get('product_line', 'Commercial'),
+                                               date_shift=sc.get('date_shift', 0))
+        out.extend((v_table, row) for row in v_rows)
+        out.extend(self.generate_scenario_events(sc))
+        return out
+
+    def _template_rows(self, sc, index=None, max_templates=4096):
+        """
+        generate_scenario_rows() with template reuse. The RNG stream is keyed by the
+        scenario's structure instead of its member ID, so a stamped copy is exactly what
+        generating the scenario would have produced - in any order, in any process.
+        """
+        key = scenario_key(sc)
+        template = self._templates.get(key)
+        if template is None:
+            rows = self._scenario_rows(sc, index, stream=key)
+            if len(self._templates) < max_templates:
+                self._templates[key] = (sc['id'], self.claim_ids.shard_start(self.claim_ids.shard), rows)
+            return rows
+
+        self.begin_member(sc['id'], index, stream=key)
+        return self._stamp_template(template, sc)
+
+    def _stamp_template(self, template, sc):
+        """Copies a template's rows for another member: new member ID, re-drawn claim IDs, own demographics."""
+        old_id, old_start, rows = template
+        mem_id = sc['id']
+        offset = self.claim_ids.shard_start(self.claim_ids.shard) - old_start
+        claim_suffix = f"_{old_id}"
+
+        # Demographics are keyed by member ID, so the member row is always regenerated
+        out = [(rows[0][0], self.generate_member_base(mem_id, sc['age'], sc.get('gender', 'M'), overrides=sc.get('overrides', {})))]
+        for table_name, row in rows[1:]:
+            row = dict(row)
+            layout = self._layouts_by_name.get(table_name)
+            if layout is not None:
+                for col in (layout.id_column, layout.pk):
+                    if col and row.get(col) == old_id:
+                        row[col] = mem_id
+                for col in self._claim_columns[table_name]:
+                    value = row.get(col)
+                    if not isinstance(value, str):
+                        continue
+                    head, _, number = value.rpartition('_')
+                    # Pinned (test case) claim IDs are kept; only allocated ones move shards
+                    if head.endswith(claim_suffix) and number.isdigit() and 0 <= int(number) - old_start < self.claim_ids.shard_size:
+                        row[col] = f"{head[:-len(claim_suffix)]}_{mem_id}_{int(number) + offset}"
+            out.append((table_name, row))
+        return out
+
+    # ⚡ Volume Mode: every parsed scenario -> N synthetic members
+    def expand_volume(self, scenarios, n, max_jitter_days=14):
+        """
+        Lazily yields n variants of each scenario with IDs <id>_V<k>. Each variant has its
+        own member ID, so its codes are drawn from the same value sets by its own RNG stream.
+        Its visit and event dates (explicit or default) move together by one jitter of up to
+        max_jitter_days, so gaps between events are kept and no date leaves its calendar
+        year. Enrollment spans are left alone so continuous-enrollment logic is unchanged.
+        """
+        width = len(str(n))
+        for sc in scenarios:
+            _normalize_event_overrides(sc.get('overrides') or {})
+            for k in range(1, n + 1):
+                mem_id = f"{sc['id']}_V{k:0{width}d}"
+                yield self._jittered_variant(sc, mem_id, random.Random(f"{self.seed}:volume:{mem_id}"), max_jitter_days)
+
+    def _jittered_variant(self, sc, mem_id, rng, max_jitter_days):
+        """Copy of sc for mem_id with all visit/event dates shifted by one in-year jitter."""
+        overrides = dict(sc.get('overrides') or {})
+        events = {name: [dict(meta) for meta in metas] for name, metas in (overrides.get('events') or {}).items()}
+        by_index = dict(overrides.get('events_by_index') or {})
+        visits = [dict(v) for v in sc.get('visit_spans') or []]
+
+        # (container, key) of every dated value; parsed once to bound the shared shift
+        slots = [(v, 'date') for v in visits if v.get('date')]
+        slots += [(meta, 'date') for metas in events.values() for meta in metas if meta.get('date')]
+        slots += [(by_index, k) for k in by_index if by_index[k]]
+        variant = dict(sc, id=mem_id)
+        if sc.get('event_date_override'):
+            slots.append((variant, 'event_date_override'))
+
+        # Undated events default to Jun 1 of the MY (generate_clinical_event) and the default
+        # visit to Feb 1 (generate_visits); both shift too, so they bound the shift as well
+        dates = [self.parse_date_str(c[k]) for c, k in slots] + [datetime(self.year, 6, 1)]
+        if not visits:
+            dates.append(datetime(self.year, 2, 1))
+        low = max(-max_jitter_days, *((datetime(d.year, 1, 1) - d).days for d in dates))
+        high = min(max_jitter_days, *((datetime(d.year, 12, 31) - d).days for d in dates))
+        shift = rng.randint(low, high) if low <= high else 0
+        for (container, key), d in zip(slots, dates):
+            container[key] = d + timedelta(days=shift)
+        variant['date_shift'] = shift
+
+        if events:
+            overrides['events'] = events
+        if by_index:
+            overrides['events_by_index'] = by_index
+        variant['overrides'] = overrides
+        variant['visit_spans'] = visits
+        return variant
+
+    # ⚡ Columnar Batch Generation: whole scenario lists -> per-table column arrays
+    def generate_batch(self, scenarios, rng=None, start=0):
+        """
+        Columnar counterpart of the per-scenario generators, for large populations.
+        Returns {table_name: ColumnBatch}. Member, enrollment and default visit tables are
+        built with vectorized date arithmetic, bulk code sampling and pooled demographics;
+        explicit visit spans, clinical events, exclusions and monthly flags still use the
+        row generators and are appended as column blocks. `start` is the run position of
+        scenarios[0] (claim ID shards continue across chunked calls).
+        """
+        rng = np.random.default_rng(self.seed if rng is None else rng)
+        out = {t.name: ColumnBatch() for t in self.layouts.values()}
+        if not scenarios:
+            return out
+
+        mem_ids = np.array([sc['id'] for sc in scenarios] + [None], dtype=object)[:-1]
+        overrides = [sc.get('overrides', {}) for sc in scenarios]
+
+        out[self.layouts['member'].name].add_columns(
+            len(scenarios), self._member_columns(scenarios, mem_ids, overrides, rng))
+
+        n_enr, enr_cols = self._enrollment_columns(scenarios, overrides, rng)
+        out[self.layouts['enrollment'].name].add_columns(n_enr, enr_cols)
+
+        # Scenarios without explicit visits share one vectorized default visit
+        default_visit = [i for i, sc in enumerate(scenarios) if not sc.get('visit_spans')]
+        if self.mocking_depth != 'scenario' and default_visit:
+            idx = np.array(default_visit)
+            out[self.layouts['visit'].name].add_columns(
+                len(idx), self._default_visit_columns(scenarios, mem_ids[idx], idx, overrides, rng, start), positions=idx)
+
+        # Default visits already took the first claim numbers of their scenario's shard
+        default_claims = set(default_visit) if self.mocking_depth != 'scenario' else set()
+        claims_per_visit = 2 if self.column_scope == 'all' and 'claim_id' in self.layouts['visit'].fields else 1
+
+        # Row-generated rows remember their scenario, so tables that also hold a vectorized
+        # block (the default visits) come out in the row path's per-scenario order
+        rows_by_table, positions = {}, {}
+        for i, sc in enumerate(scenarios):
+            self.begin_member(sc['id'], start + i)
+            if i in default_claims:
+                for _ in range(claims_per_visit):
+                    self.claim_ids.next()
+            if sc.get('visit_spans'):
+                v_table, v_rows = self.generate_visits(sc['id'], spans=sc['visit_spans'], overrides=sc.get('overrides', {}), product_line=sc.get('product_line', 'Commercial'))
+                rows_by_table.setdefault(v_table, []).extend(v_rows)
+                positions.setdefault(v_table, []).extend([i] * len(v_rows))
+            for table_name, row in self.generate_scenario_events(sc):
+                if table_name:
+                    rows_by_table.setdefault(table_name, []).append(row)
+                    positions.setdefault(table_name, []).append(i)
+
+        for table_name, rows in rows_by_table.items():
+            out.setdefault(table_name, ColumnBatch()).add_rows(rows, positions=positions[table_name])
+        return out
+
+    def _member_columns(self, scenarios, mem_ids, overrides, rng):
+        target_table = self.layouts['member']
+        fields = target_table.fields
+        n = len(scenarios)
+
+        ages, genders, healed = [], [], 0
+        for sc in scenarios:
+            is_valid, age, gender = self.validate_demographics(sc['age'], sc.get('gender', 'M'))
+            healed += not is_valid
+            ages.append(age)
+            genders.append(gender)
+        if healed:
+            print(f"  ✨ [Smart Fallback] Auto-populated missing demographics for {healed} members")
+        ages = np.array(ages, dtype=np.int64)
+        genders = np.array(genders, dtype=object)
+
+        demo = self.demographics.draw(mem_ids, genders == 'F')
+        cols = {
+            target_table.pk: mem_ids,
+            # June 15 of (MY - age), same as calculate_birth_date
+            fields['dob']: ((self.year - ages - 1970) * 12 + 5).astype('datetime64[M]').astype('datetime64[D]') + 14,
+            fields['gender']: genders,
+        }
+        cols.update({fields[key]: values for key, values in demo.items()})
+
+        # ⚡ Source Compliance
+        if 'file_id' in fields:
+            cols[fields['file_id']] = self._bulk_file_ids('MEMBER_IN', n, rng)
+
+        for i, ov in enumerate(overrides):
+            for field, val in (ov or {}).items():
+                if field in cols:
+                    _set_cell(cols, field, i, val)
+        return cols
+
+    def _bulk_file_ids(self, category, n, rng):
+        """Vectorized _get_random_file_id."""
+        if category in self.file_ids:
+            return np.array(self.file_ids[category], dtype=object)[rng.integers(0, len(self.file_ids[category]), size=n)]
+        return np.full(n, 90000, dtype=object) # Default fallback
+
+    def _enrollment_columns(self, scenarios, overrides, rng):
+        target_table = self.layouts['enrollment']
+        fields = target_table.fields
+
+        owner, starts, ends, pids, span_meta = [], [], [], [], []
+        for i, sc in enumerate(scenarios):
+            product_id = self.pl_map.get(sc.get('product_line', 'Medicare'), 1)
+            for span in sc.get('enrollment_spans') or [{'start': "1/1/my", 'end': "12/31/my"}]:
+                p_id = span.get('product_id')
+                owner.append(i)
+                starts.append(span['start'])
+                ends.append(span['end'])
+                pids.append(int(p_id) if (p_id and str(p_id).isdigit()) else product_id)
+                span_meta.append(span)
+
+        n = len(owner)
+        owner = np.array(owner)
+        start = self.parse_dates(starts).values
+        end = self.parse_dates(ends).values
+
+        cols = {
+            target_table.pk: np.array([scenarios[i]['id'] for i in owner.tolist()] + [None], dtype=object)[:-1],
+            fields['start_date']: start,
+            fields['end_date']: end,
+        }
+        for col, val in ENROLLMENT_DEFAULTS.items():
+            cols[col] = np.full(n, val, dtype=object)
+        cols['PRODUCT_ID'] = np.array(pids, dtype=object)
+        cols['PRODUCT_ID_2'] = cols['PRODUCT_ID'].copy()
+
+        # ⚡ Source Compliance
+        if 'file_id' in fields:
+            cols[fields['file_id']] = self._bulk_file_ids('ENROLLMENT_IN', n, rng)
+
+        # 1. Global overrides, 2. span-specific overrides (same precedence as the row path)
+        for j in range(n):
+            for f, v in (overrides[owner[j]] or {}).items():
+                col = f if f in cols else target_table.resolve(f)
+                if col and col in cols:
+                    _set_cell(cols, col, j, v)
+            span = span_meta[j]
+            if 'coverage_indicator' in span:
+                _set_cell(cols, 'COVERAGE_INDICATOR', j, span['coverage_indicator'])
+            if 'BEN_HOSPICE' in span:
+                _set_cell(cols, 'BEN_HOSPICE', j, span['BEN_HOSPICE'])
+
+        # FLD00 - FLD23: enrolled in month (Jan MY-1 .. Dec MY) if the span covers the 1st
+        # or starts within that month
+        months = np.arange(np.datetime64(f'{self.year - 1}-01'), np.datetime64(f'{self.year + 1}-01'))
+        month_starts = months.astype('datetime64[D]').astype(start.dtype)
+        enrolled = ((start[:, None] <= month_starts) & (month_starts <= end[:, None])) | \
+                   (start.astype('datetime64[M]')[:, None] == months)
+        for i, fld in enumerate(FLD_COLUMNS):
+            cols[fld] = enrolled[:, i].astype(np.int64)
+        return n, cols
+
+    def _default_visit_columns(self, scenarios, mem_ids, idx, overrides, rng, start=0):
+        """Vectorized generate_visits for the default population 'Outpatient' visit."""
+        target_table = self.layouts['visit']
+        fields = target_table.fields
+        n = len(mem_ids)
+
+        cpt = np.full(n, "99213", dtype=object)
+        diag = np.full(n, "Z00.00", dtype=object)
+        rev = np.full(n, None, dtype=object)
+
+        if self.vsd_manager:
+            candidates = self.vsd_manager.find_value_sets("Outpatient")
+            if candidates:
+                codes, systems = self.vsd_manager.sample_codes(candidates[0], n, rng=rng, year=self.year)
+                # ⚡ Smart Routing, decided once per distinct code system
+                for system in set(systems.tolist()) - {None}:
+                    sys_upper = str(system).upper()
+                    mask = systems == system
+                    if any(x in sys_upper for x in ['CPT', 'HCPCS', 'PROCEDURE']):
+                        cpt[mask] = codes[mask]
+                    elif any(x in sys_upper for x in ['ICD', 'DIAGNOSIS', 'CM']):
+                        diag[mask] = codes[mask]
+                    elif any(x in sys_upper for x in ['REV', 'UBREV', 'REVENUE']):
+                        rev[mask] = codes[mask]
+
+            # Always try to get a relevant diagnosis code if we don't have one yet
+            need_diag = diag == "Z00.00"
+            diag_sets = self.vsd_manager.find_value_sets("Diagnosis")
+            if need_diag.any() and diag_sets:
+                drawn, _ = self.vsd_manager.sample_codes(min(diag_sets, key=len), int(need_diag.sum()), rng=rng, year=self.year)
+                drawn = np.where(drawn == None, "Z00.00", drawn)
+                diag[need_diag] = drawn
+
+        # Claim numbers as the row path draws them: visit key first, then claim_id
+        claim_nos = self.claim_ids.shard_start(idx + start).tolist()
+        cols = {
+            target_table.fk: mem_ids,
+            target_table.pk: np.array([f"C_{m}_{c}" for m, c in zip(mem_ids.tolist(), claim_nos)], dtype=object),
+            fields['date']: np.datetime64(f'{self.year}-02-01') + np.array([scenarios[i].get('date_shift', 0) for i in idx.tolist()], dtype='timedelta64[D]'),
+            fields['pos']: np.full(n, "11", dtype=object),
+            "CPT_1": cpt,
+            "DIAG_I_1": diag,
+        }
+        if (rev != None).any():
+            cols["REVENUE_CODE"] = rev
+
+        # ⚡ Apply Pinned Overrides for V1 (same key resolution as generate_visits)
+        for j, i in enumerate(idx.tolist()):
+            pinned = (overrides[i] or {}).get('pinned_visits', {}).get(1)
+            for k, v in (pinned or {}).items():
+                if k in cols: col = k
+                elif k.lower() in fields: col = fields[k.lower()]
+                elif k.upper() in cols: col = k.upper()
+                else: col = k
+                _set_cell(cols, col, j, v)
+
+        if self.column_scope == 'all':
+            if 'claim_id' in fields:
+                cols[fields['claim_id']] = np.array([f"CL_{m}_{c + 1}" for m, c in zip(mem_ids.tolist(), claim_nos)], dtype=object)
+            product_lines = [scenarios[i].get('product_line', 'Commercial') for i in idx.tolist()]
+            for pl in set(product_lines):
+                mask = np.array([p == pl for p in product_lines])
+                for col, val in self._visit_claim_defaults(fields, product_line=pl).items():
+                    _set_cell(cols, col, mask, val)
+            if 'file_id' in fields:
+                cols[fields['file_id']] = self._bulk_file_ids('VISIT_IN', n, rng)
+        return cols
+
+def _set_cell(cols, col, rows, value):
+    """Assigns value to rows of column `col`, widening the column to object dtype as needed."""
+    n = len(next(iter(cols.values())))
+    arr = cols.get(col)
+    if arr is None:
+        arr = np.full(n, None, dtype=object)
+    elif arr.dtype != object:
+        arr = _as_object(arr)
+    arr[rows] = value
+    cols[col] = arr
+
+def _as_object(arr):
+    arr = np.asarray(arr)
+    if arr.dtype.kind == 'M':
+        # datetime64 -> datetime.datetime (plain astype(object) turns ns values into ints)
+        return arr.astype('datetime64[us]').astype(object)
+    return arr.astype(object)
+
+class ColumnBatch:
+    """
+    Column-oriented table buffer for batch generation. Vectorized column blocks and
+    ordinary row dicts can be mixed; cells a block does not set are None.
+    When every block gives the scenario position of its rows, rows come out grouped by
+    scenario (stable, so a scenario's rows keep block order), as the row path writes them.
+    """
+
+    def __init__(self):
+        self.length = 0
+        self._blocks = []
+        self._positions = []
+
+    def __len__(self):
+        return self.length
+
+    def add_columns(self, n, columns, positions=None):
+        if n:
+            self._blocks.append((n, columns))
+            self._positions.append(positions)
+            self.length += n
+
+    def add_rows(self, rows, positions=None):
+        keys = list(dict.fromkeys(k for row in rows for k in row))
+        self.add_columns(len(rows), {k: np.array([row.get(k) for row in rows] + [None], dtype=object)[:-1] for k in keys}, positions)
+
+    def _row_order(self):
+        """Stable scenario-order permutation, or None if blocks are already in row order."""
+        if len(self._blocks) < 2 or any(p is None for p in self._positions):
+            return None
+        positions = np.concatenate([np.asarray(p) for p in self._positions])
+        order = np.argsort(positions, kind='stable')
+        return None if (order == np.arange(len(order))).all() else order
+
+    def columns(self, names=None):
+        """
+        Returns {column: ndarray}, every column padded to the table length.
+        With `names`, only the listed columns the table has, in that order.
+        """
+        present = list(dict.fromkeys(k for _, cols in self._blocks for k in cols))
+        if names is not None:
+            present = set(present)
+            names = [name for name in names if name in present]
+        else:
+            names = present
+        order = self._row_order()
+        out = {}
+        for name in names:
+            parts = [np.asarray(cols[name]) if name in cols else np.full(n, None, dtype=object) for n, cols in self._blocks]
+            if len({p.dtype for p in parts}) > 1:
+                parts = [_as_object(p) for p in parts]
+            out[name] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            if order is not None:
+                out[name] = out[name][order]
+        return out
+
+    def to_frame(self, columns=None):
+        """DataFrame of the table; with `columns`, built directly in that column order (absent ones left out)."""
+        return pd.DataFrame(self.columns(columns))
+
+    def to_rows(self):
+        """Row dicts, for consumers of the per-scenario data_store format."""
+        cols = {k: _as_object(v) for k, v in self.columns().items()}
+        return [dict(zip(cols, values)) for values in zip(*cols.values())]
@@ -0,0 +1,144 @@
+import os
+import json
+import glob
+import time
+import shutil
+import hashlib
+from functools import lru_cache
+
+# Content digests of input files, keyed by (path, size, mtime) so unchanged files are hashed once
+_digests = {}
+
+def file_digest(path):
+    """SHA-256 of a file's content (None if it does not exist)."""
+    if not path or not os.path.isfile(path):
+        return None
+    stat = os.stat(path)
+    sig = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if sig not in _digests:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        _digests[sig] = h.hexdigest()
+    return _digests[sig]
+
+@lru_cache(maxsize=1)
+def code_digest(root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))):
+    """Digest of the generator's own sources: a code change must not serve outputs of the old code."""
+    files = sorted(glob.glob(os.path.join(root, 'src', '*.py'))) + [os.path.join(root, 'main.py')]
+    return hashlib.sha256(''.join(f"{os.path.basename(f)}:{file_digest(f)}" for f in files).encode()).hexdigest()
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path)
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def _copy(src, dst):
+    _remove(dst)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+class OutputCache:
+    """
+    Content-addressed store of generated artifacts under OUTPUT_DIR/.cache.
+    An entry lives in <root>/<key>/ and is keyed by the digest of every input file and
+    generation option; index.json records size and hits per entry. Only seeded runs are
+    cached (the caller's job): an unseeded run must draw fresh data, not replay an old one.
+    Entries unused for max_age_days are evicted, then the least recently used until the
+    cache fits in max_mb.
+    Index writes are atomic but not locked: concurrent runs may lose an index update,
+    which only costs a future miss (unindexed entry dirs are swept once stale).
+    """
+
+    def __init__(self, root, max_age_days=None, max_mb=None):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.json')
+        self.max_age = float(max_age_days if max_age_days is not None else os.getenv('OUTPUT_CACHE_MAX_AGE_DAYS', 7)) * 86400
+        self.max_bytes = float(max_mb if max_mb is not None else os.getenv('OUTPUT_CACHE_MAX_MB', 2048)) * 2**20
+
+    @staticmethod
+    def key(files, options):
+        """Cache key: content digests of `files` ({role: path}) plus the generation `options`."""
+        parts = {'code': code_digest(), 'files': {role: file_digest(path) for role, path in files.items()}, 'options': options}
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def fetch(self, key, output_dir, require=()):
+        """
+        On a hit, restores the artifact (and the entry's extra files, e.g. the quality report)
+        into output_dir and returns the artifact path; else None. An entry missing any of the
+        `require`d extra files is a miss, so the caller regenerates them.
+        """
+        index = self._load_index()
+        entry = index.get(key)
+        if not entry or not set(require) <= set(entry.get('extras', ())):
+            return None
+        names = [entry['artifact']] + entry.get('extras', [])
+        if not all(os.path.exists(os.path.join(self.root, key, name)) for name in names):
+            del index[key]
+            self._save_index(index)
+            return None
+        for name in names:
+            _copy(os.path.join(self.root, key, name), os.path.join(output_dir, name))
+        entry['hits'] = entry.get('hits', 0) + 1
+        entry['last_used'] = time.time()
+        self._save_index(index)
+        return os.path.join(output_dir, entry['artifact'])
+
+    def store(self, key, artifact, measure, extras=()):
+        """Copies a freshly generated artifact (and extra files) into the cache, then evicts."""
+        entry_dir = os.path.join(self.root, key)
+        paths = [artifact] + [p for p in extras if os.path.exists(p)]
+        names = [os.path.basename(os.path.normpath(p)) for p in paths]
+        os.makedirs(entry_dir, exist_ok=True)
+        for path, name in zip(paths, names):
+            _copy(path, os.path.join(entry_dir, name))
+        index = self._load_index()
+        now = time.time()
+        index[key] = {'measure': measure, 'artifact': names[0], 'extras': names[1:], 'bytes': sum(_size(p) for p in paths),
+                      'created': now, 'last_used': now, 'hits': 0}
+        self.evict(index)
+
+    def evict(self, index=None):
+        """Drops entries past max_age, then least recently used ones until under max_bytes."""
+        index = self._load_index() if index is None else index
+        now = time.time()
+        for key in [k for k, e in index.items() if now - e['last_used'] > self.max_age]:
+            del index[key]
+            _remove(os.path.join(self.root, key))
+        total = sum(e['bytes'] for e in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= index[key]['bytes']
+            del index[key]
+            _remove(os.path.join(self.root, key))
+        # Entry dirs missing from the index (lost concurrent update), once clearly not in flight
+        for key in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, key)
+            if os.path.isdir(entry_dir) and key not in index and now - os.path.getmtime(entry_dir) > 3600:
+                _remove(entry_dir)
+        self._save_index(index)
+        return index
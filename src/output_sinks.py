@@ -0,0 +1,260 @@
+import os
+import glob
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime
+import pandas as pd
+from src.xlsx_stream import StreamingWorkbook, _cell
+
+# Output formats: name -> suffix of the default artifact (directories for per-table formats)
+FORMATS = {'xlsx': '.xlsx', 'csv': '', 'parquet': '', 'sqlite': '.sqlite'}
+
+def _text(value):
+    return value.strftime('%Y-%m-%d') if isinstance(value, datetime) else str(value)
+
+def _date_columns(df):
+    """Row-generated dates arrive as datetime objects; type all-date object columns as datetime64."""
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].dropna()
+        is_date = values.map(lambda v: isinstance(v, datetime))
+        if len(values) and is_date.all():
+            df[col] = pd.to_datetime(df[col])
+        elif is_date.any():
+            # Pinned overrides may put numbers or text in a date field: keep it text, dates as YYYY-MM-DD
+            df[col] = df[col].map(lambda v: _text(v) if isinstance(v, datetime) else v)
+    return df
+
+def _clear_tables(path, ext):
+    """Per-table output dirs are rewritten whole: drop tables left by an earlier run."""
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, f'*{ext}')):
+        os.remove(stale)
+
+class _BufferedTable:
+    """
+    List-like row buffer for one table of a per-table sink: rows are flushed to the
+    sink every flush_rows, so the same data_store code paths stream into any format.
+    """
+
+    def __init__(self, sink, name):
+        self.sink = sink
+        self.name = name
+        self.columns = None
+        self.rows = 0
+        self._buffer = []
+
+    def __len__(self):
+        return self.rows + len(self._buffer)
+
+    def append(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.sink.flush_rows:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def write_frame(self, df):
+        self.flush()
+        if not df.empty:
+            self._write(df)
+
+    def flush(self):
+        if self._buffer:
+            rows, self._buffer = self._buffer, []
+            # Framed straight into the table's column order
+            self._write(pd.DataFrame(rows, columns=self.columns or self.sink.columns_for(self.name)))
+
+    def _write(self, df):
+        first = self.columns is None
+        if first:
+            # Fixed per-table columns (schema order, else the first chunk's) so chunks line up
+            self.columns = list(self.sink.columns_for(self.name) or df.columns)
+        if list(df.columns) != self.columns:
+            df = df.reindex(columns=self.columns)
+        self.sink.write(self.name, _date_columns(df), first)
+        self.rows += len(df)
+
+class _TableSink(ABC):
+    """Base for per-table sinks: sheet(name) / close() like StreamingWorkbook."""
+    flush_rows = 10000
+
+    def __init__(self, path, columns_for=lambda name: None):
+        self.path = path
+        self.columns_for = columns_for
+        self.tables = {}
+
+    def sheet(self, name):
+        if name not in self.tables:
+            self.tables[name] = _BufferedTable(self, name)
+        return self.tables[name]
+
+    @abstractmethod
+    def write(self, name, df, first):
+        """Writes one chunk of table `name` (`first`: the table's first chunk, so create/replace it)."""
+
+    def finish(self):
+        pass
+
+    def close(self):
+        for table in self.tables.values():
+            table.flush()
+        self.finish()
+        return {name: len(table) for name, table in self.tables.items() if len(table)}
+
+class CsvSink(_TableSink):
+    """Directory with one CSV per table (dates as YYYY-MM-DD)."""
+
+    def __init__(self, path, columns_for=lambda name: None):
+        super().__init__(path, columns_for)
+        _clear_tables(path, '.csv')
+
+    def write(self, name, df, first):
+        csv_path = os.path.join(self.path, f'{name}.csv')
+        df.to_csv(csv_path, mode='w' if first else 'a', header=first, index=False, date_format='%Y-%m-%d')
+
+class ParquetSink(_TableSink):
+    """
+    Directory with one Parquet file per table, one row group per flush. Column types are
+    fixed by the first flush: dates, integers, floats, and text for anything mixed or empty.
+    """
+
+    def __init__(self, path, columns_for=lambda name: None):
+        super().__init__(path, columns_for)
+        _clear_tables(path, '.parquet')
+        self.writers = {}
+
+    @staticmethod
+    def _arrow_type(values):
+        import pyarrow as pa
+        present = [v for v in values if v is not None]
+        if present and all(isinstance(v, datetime) for v in present):
+            return pa.timestamp('us')
+        if present and all(type(v) is int for v in present):
+            return pa.int64()
+        if present and all(type(v) in (int, float) for v in present):
+            return pa.float64()
+        return pa.string()
+
+    @staticmethod
+    def _convert(values, arrow_type):
+        """Values coerced to arrow_type; returns (values, number that did not fit)."""
+        import pyarrow as pa
+        if pa.types.is_string(arrow_type):
+            return [None if v is None else _text(v) for v in values], 0
+        if pa.types.is_timestamp(arrow_type):
+            fits = lambda v: isinstance(v, datetime)
+        elif pa.types.is_integer(arrow_type):
+            fits = lambda v: type(v) is int or (type(v) is float and v.is_integer())
+        else:
+            fits = lambda v: type(v) in (int, float)
+        out = [v if v is None or fits(v) else None for v in values]
+        if pa.types.is_integer(arrow_type):
+            out = [None if v is None else int(v) for v in out]
+        return out, sum(v is not None and o is None for v, o in zip(values, out))
+
+    def write(self, name, df, first):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        columns = [[_cell(v) for v in df[col].tolist()] for col in df.columns]
+        if first:
+            schema = pa.schema([(str(col), self._arrow_type(values)) for col, values in zip(df.columns, columns)])
+            self.writers[name] = pq.ParquetWriter(os.path.join(self.path, f'{name}.parquet'), schema)
+        schema = self.writers[name].schema
+        arrays = []
+        for field, values in zip(schema, columns):
+            values, dropped = self._convert(values, field.type)
+            if dropped:
+                print(f"    ⚠️  {name}.{field.name}: {dropped} value(s) not {field.type} (the column type set by the first chunk) written as null")
+            arrays.append(pa.array(values, type=field.type))
+        self.writers[name].write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    def finish(self):
+        for writer in self.writers.values():
+            writer.close()
+
+class SqliteSink(_TableSink):
+    """Single SQLite database, one table per sheet (dates as YYYY-MM-DD text, like the CSVs)."""
+
+    def __init__(self, path, columns_for=lambda name: None):
+        super().__init__(path, columns_for)
+        if os.path.exists(path):
+            os.remove(path)
+        self.conn = sqlite3.connect(path)
+
+    @staticmethod
+    def _value(value):
+        value = _cell(value)
+        return _text(value) if isinstance(value, datetime) else value
+
+    def write(self, name, df, first):
+        columns = ', '.join(f'"{c}"' for c in df.columns)
+        if first:
+            self.conn.execute(f'CREATE TABLE "{name}" ({columns})')
+        rows = ([self._value(v) for v in values] for values in df.astype(object).itertuples(index=False, name=None))
+        self.conn.executemany(f'INSERT INTO "{name}" ({columns}) VALUES ({", ".join("?" * len(df.columns))})', rows)
+
+    def finish(self):
+        self.conn.commit()
+        self.conn.close()
+
+SINKS = {'xlsx': StreamingWorkbook, 'csv': CsvSink, 'parquet': ParquetSink, 'sqlite': SqliteSink}
+
+def open_sink(output_format, path, columns_for=lambda name: None, created=None):
+    """Sink for output_format at path (a file, or a directory for csv/parquet)."""
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format '{output_format}' (choose from {', '.join(SINKS)})")
+    if output_format == 'xlsx':
+        return StreamingWorkbook(path, columns_for, created=created)
+    return SINKS[output_format](path, columns_for)
+
+# Text forms of the numbers and dates CsvSink writes
+_CSV_INT = r'-?(?:0|[1-9]\d*)'
+_CSV_FLOAT = r'-?(?:0|[1-9]\d*)\.\d+(?:e[+-]?\d+)?'
+_CSV_DATE = r'\d{4}-\d{2}-\d{2}'
+
+def _typed_columns(df):
+    """Object columns holding only dates or only numbers -> datetime64 / numeric dtypes."""
+    df = _date_columns(df)
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].dropna()
+        if values.map(lambda v: type(v) in (int, float)).all():
+            df[col] = pd.to_numeric(df[col])
+    return df
+
+def _read_csv(path):
+    """
+    Reads a CsvSink table as text, then types whole columns that are nothing but numbers or
+    YYYY-MM-DD dates. A column with any other text stays text, so zero-padded identifiers
+    ('0987654321', ZIP '02419') survive; blanks are missing values.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    for col in df.columns:
+        text = df[col]
+        blank = text == ''
+        if (blank | text.str.fullmatch(_CSV_INT) | text.str.fullmatch(_CSV_FLOAT)).all():
+            df[col] = pd.to_numeric(text.mask(blank))
+        elif (blank | text.str.fullmatch(_CSV_DATE)).all():
+            df[col] = pd.to_datetime(text.mask(blank))
+        else:
+            df[col] = text.mask(blank)
+    return df
+
+def load_tables(path):
+    """
+    Reads any sink's output back as {table_name: DataFrame}, keeping identifiers as written
+    (no numeric inference on text cells, which would strip leading zeros).
+    """
+    if os.path.isdir(path):
+        tables = {}
+        for file in sorted(glob.glob(os.path.join(path, '*.csv')) + glob.glob(os.path.join(path, '*.parquet'))):
+            name, ext = os.path.splitext(os.path.basename(file))
+            tables[name] = pd.read_parquet(file) if ext == '.parquet' else _read_csv(file)
+        return tables
+    if os.path.splitext(path)[1].lower() in ('.sqlite', '.db'):
+        with sqlite3.connect(path) as conn:
+            names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")]
+            return {name: pd.read_sql_query(f'SELECT * FROM "{name}"', conn) for name in names}
+    # dtype=object: cells keep the type they were written with (text stays text)
+    return {name: _typed_columns(df) for name, df in pd.read_excel(path, sheet_name=None, dtype=object).items()}
@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Per-process engine, built once by the pool initializer
+_worker_engine = None
+
+def _load_vsd(vsd_path, measurement_year):
+    """Shared VSD server when configured, else the cached (memory-mapped) local index."""
+    if os.getenv('VSD_SERVER_ADDRESS'):
+        from src.vsd_server import connect_if_serving
+        client = connect_if_serving(vsd_path, os.getenv('VSD_SERVER_ADDRESS'))
+        if client is not None:
+            return client
+    from src.vsd import VSDManager
+    return VSDManager(vsd_path, measurement_year=measurement_year)
+
+def _init_worker(spec, vsd_path, measurement_year):
+    global _worker_engine
+    from src.engine import MockupEngine
+    vsd_manager = _load_vsd(vsd_path, measurement_year) if vsd_path else None
+    _worker_engine = MockupEngine(vsd_manager=vsd_manager, **spec)
+
+def _generate_chunk(chunk):
+    """Rows for a contiguous run of scenarios, grouped per table in scenario order."""
+    start, scenarios = chunk
+    rows_by_table = {}
+    for index, sc in enumerate(scenarios, start):
+        for table_name, row in _worker_engine.generate_scenario_rows(sc, index):
+            rows_by_table.setdefault(table_name, []).append(row)
+    return rows_by_table
+
+def chunk_scenarios(scenarios, workers, chunks_per_worker=4):
+    """Contiguous (start index, slice) pairs, several per worker so uneven scenarios still balance."""
+    if not scenarios:
+        return []
+    n_chunks = max(1, min(len(scenarios), workers * chunks_per_worker))
+    size = -(-len(scenarios) // n_chunks)
+    return [(i, scenarios[i:i + size]) for i in range(0, len(scenarios), size)]
+
+def generate_parallel(engine, scenarios, workers, data_store, progress=None):
+    """
+    Generates scenarios across a process pool into data_store ({table_name: [rows]}).
+    Each worker rebuilds the engine from engine.spec (same seed), every member draws from
+    its own RNG stream and claim IDs come from the scenario's own shard, so merging chunk
+    results in order reproduces the serial run exactly.
+    """
+    vsd = engine.vsd_manager
+    vsd_path = os.path.abspath(vsd.vsd_path) if vsd is not None else None
+    measurement_year = getattr(vsd, 'measurement_year', engine.year)
+
+    chunks = chunk_scenarios(scenarios, workers)
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(engine.spec, vsd_path, measurement_year)) as pool:
+        # map() yields results in submission order, whichever worker finishes first
+        for chunk, rows_by_table in zip(chunks, pool.map(_generate_chunk, chunks)):
+            for table_name, rows in rows_by_table.items():
+                if table_name and table_name in data_store:
+                    data_store[table_name].extend(rows)
+            done += len(chunk[1])
+            if progress:
+                progress(done, len(scenarios))
+    return data_store
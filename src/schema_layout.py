@@ -0,0 +1,66 @@
+class TableLayout:
+    """
+    One schema_map.yaml table compiled for row building.
+    The physical table name, key columns and logical -> physical field map are resolved
+    once, so row builders look fields up instead of re-reading the schema per row.
+    Rows stay dicts keyed by physical column: test case overrides, template stamping and
+    the quality/NCQA checks all address cells by name. Preallocated arrays are what the
+    columnar path (MockupEngine.generate_batch -> ColumnBatch) fills instead.
+    """
+    __slots__ = ('key', 'name', 'pk', 'fk', 'id_column', 'fields', 'physical')
+
+    def __init__(self, key, spec):
+        self.key = key
+        self.name = spec['name']
+        self.pk = spec.get('pk')
+        self.fk = spec.get('fk')
+        # Column that carries the member ID on event rows
+        self.id_column = self.fk or self.pk
+        self.fields = dict(spec.get('fields') or {})
+
+        physical = {c for c in (self.id_column, self.pk) if c}
+        for col in self.fields.values():
+            physical.update(col if isinstance(col, list) else [col])
+        self.physical = frozenset(physical)
+
+    def __repr__(self):
+        return f"TableLayout({self.key!r} -> {self.name!r}, {len(self.physical)} columns)"
+
+    def select(self, *logical):
+        """Physical column names for the given logical fields, in order."""
+        return tuple(self.fields[f] for f in logical)
+
+    def resolve(self, field):
+        """Physical column for a logical name or physical column name, else None."""
+        if field in self.physical:
+            return field
+        col = self.fields.get(field)
+        return col if isinstance(col, str) else None
+
+def compile_layouts(schema):
+    """{table_key: TableLayout} for every table in a loaded schema_map.yaml."""
+    return {key: TableLayout(key, spec) for key, spec in schema['tables'].items()}
+
+def resolve_output_columns(table_names, full_schema):
+    """
+    {table_name: output column tuple (None if unknown)} from data_columns_info.json.
+    Tables missing from the schema borrow the columns of the first schema table with the
+    same logical type (e.g. SMD_VISIT_IN -> PSA_VISIT_IN), via one index of inner name parts.
+    """
+    by_type = {}
+    for existing in full_schema:
+        for part in existing.split('_')[1:-1]:
+            by_type.setdefault(part, existing)
+
+    resolved = {}
+    for name in table_names:
+        cols = full_schema.get(name)
+        if not cols:
+            # Extract the logical part of the table name (e.g. SMD_VISIT_IN -> VISIT)
+            parts = name.split('_')
+            existing = by_type.get(parts[1] if len(parts) > 1 else 'VISIT')
+            if existing:
+                cols = full_schema[existing]
+                print(f"    ✨ Auto-mapped {name} to {existing} column structure")
+        resolved[name] = tuple(cols) if cols else None
+    return resolved
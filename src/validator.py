@@ -37,8 +37,9 @@ class HEDISValidator:
         return resolved
     
     def _load_mockup(self):
-        """Load all sheets from mockup Excel."""
-        return pd.read_excel(self.mockup_path, sheet_name=None)
+        """Load all tables from the mockup (xlsx, SQLite, or a CSV/Parquet directory)."""
+        from src.output_sinks import load_tables
+        return load_tables(self.mockup_path)
     
     def _get_table_data(self, logical_name):
         """Helper to get data from a table by its logical name."""
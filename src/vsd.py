@@ -1,255 +1,733 @@
 import pandas as pd
+import numpy as np
 from datetime import datetime
+import hashlib
+import json
+import os
+import random
 import re
+import csv
+import glob
+import itertools
+import openpyxl
+from functools import lru_cache
+
+# Patterns MockupEngine resolves for nearly every visit; warmed into the pattern cache at load.
+COMMON_PATTERNS = ('Diagnosis', 'Outpatient', 'Inpatient', 'ED', 'Emergency', 'Telehealth')
+
+# Sheets that usually hold the value-set-to-code table, checked after sheet index 3
+VSD_SHEET_NAMES = ['Value Set to Codes', 'Value Set Directory', 'Value Sets', 'Codes']
+HEADER_SCAN_ROWS = 20
+
+# Column layout written by scripts/convert_vsd.py (and recognised by the loader)
+NORMALIZED_COLUMNS = ['Value Set Name', 'Code', 'Code System', 'Effective Date', 'Expiration Date']
+
+# Bump whenever the on-disk index layout changes so stale caches are ignored.
+CACHE_VERSION = 4
+
+# Interval sentinels for rows without an effective or expiration date
+OPEN_START = np.iinfo(np.int32).min
+OPEN_END = np.iinfo(np.int32).max
+
+# Per-row validity bitmap: bit i means "valid at some point during YEAR_BASE + i"
+YEAR_BASE = 2000
+YEAR_SPAN = 64
+
+def day_number(value):
+    """Days since 1970-01-01 for a date-like value; the unit of the validity interval index."""
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+def year_bitmap(effective, expiration):
+    """Builds the uint64 year-validity bitmap for arrays of effective/expiration day numbers."""
+    def years(days, open_value, sentinel):
+        y = days.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+        return np.where(days == sentinel, open_value, y)
+
+    first = np.clip(years(effective, YEAR_BASE, OPEN_START) - YEAR_BASE, 0, YEAR_SPAN)
+    last = np.clip(years(expiration, YEAR_BASE + YEAR_SPAN - 1, OPEN_END) - YEAR_BASE, -1, YEAR_SPAN - 1)
+    
+    # Bits [first, last]: ones below last+1 minus ones below first (shift by 64 saturates)
+    def ones_below(n):
+        n = n.astype(np.uint64)
+        full = n >= YEAR_SPAN
+        return np.where(full, np.uint64(0xFFFFFFFFFFFFFFFF), (np.uint64(1) << np.where(full, 0, n).astype(np.uint64)) - np.uint64(1))
+
+    bitmap = ones_below(last + 1) & ~ones_below(first)
+    return np.where(first <= last, bitmap, np.uint64(0)).astype(np.uint64)
+
+class ValueSetStore:
+    """
+    Compact, array-backed value-set index.
+    Code strings are interned once into a contiguous UTF-8 buffer, value sets are int32
+    offset ranges into code-id arrays and code systems are a small enum column.
+    Every row carries its effective/expiration interval plus a per-year validity bitmap,
+    so one load answers queries for any year; the rows valid for the primary
+    measurement year are additionally precomputed as a second offset range.
+    When opened from disk the arrays are memory-mapped, so every worker process
+    shares one physical copy through the OS page cache.
+    """
+    MAGIC = b'VSDIDX\x00\x04'
+    ALIGN = 64
+    ARRAYS = (
+        'code_blob', 'code_offsets', 'code_system',
+        'vs_offsets', 'vs_codes', 'vs_effective', 'vs_expiration', 'vs_years',
+        'valid_offsets', 'valid_rows'
+    )
+
+    def __init__(self, names, systems, arrays, year):
+        self.names = names
+        self.systems = systems
+        self.year = year
+        for key in self.ARRAYS:
+            setattr(self, key, arrays[key])
+        self.name_index = {name: i for i, name in enumerate(names)}
+
+    @classmethod
+    def from_rows(cls, names, codes, systems, effective, expiration, year):
+        """
+        Builds the store from parallel row arrays (lowercase names, codes, systems).
+        `effective`/`expiration` are int32 day numbers (OPEN_START/OPEN_END when blank);
+        rows overlapping measurement year `year` are indexed as valid for the MY.
+        """
+        valid_mask = (effective <= day_number(datetime(year, 12, 31))) & (expiration >= day_number(datetime(year, 1, 1)))
+        
+        uniq_codes, code_ids = np.unique(codes, return_inverse=True)
+        encoded = [c.encode('utf-8') for c in uniq_codes.tolist()]
+        code_offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+        np.cumsum([len(b) for b in encoded], out=code_offsets[1:])
+        code_blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        
+        # System of a code = system of its first occurrence, preferring rows valid for the MY
+        priority = np.argsort(~valid_mask, kind='stable')
+        first_idx = priority[np.unique(codes[priority], return_index=True)[1]]
+        sys_ids, system_names = pd.factorize(systems[first_idx])
+        system_names = [str(s) for s in system_names]
+        code_system = sys_ids.astype(np.uint8 if len(system_names) < 256 else np.uint16)
+        
+        uniq_names, name_ids = np.unique(names, return_inverse=True)
+        
+        # Stable sort keeps the original VSD row order inside each value set
+        order = np.argsort(name_ids, kind='stable')
+        vs_offsets = np.zeros(len(uniq_names) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(name_ids, minlength=len(uniq_names)), out=vs_offsets[1:])
+        
+        # MY-valid view: positions into vs_codes, grouped the same way
+        sorted_valid = valid_mask[order]
+        valid_rows = np.flatnonzero(sorted_valid).astype(np.int32)
+        valid_offsets = np.zeros(len(uniq_names) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(name_ids[order][sorted_valid], minlength=len(uniq_names)), out=valid_offsets[1:])
+        
+        return cls(uniq_names.tolist(), system_names, {
+            'code_blob': code_blob, 'code_offsets': code_offsets, 'code_system': code_system,
+            'vs_offsets': vs_offsets, 'vs_codes': code_ids[order].astype(np.int32),
+            'vs_effective': effective[order].astype(np.int32), 'vs_expiration': expiration[order].astype(np.int32),
+            'vs_years': year_bitmap(effective[order], expiration[order]),
+            'valid_offsets': valid_offsets, 'valid_rows': valid_rows
+        }, year)
+
+    @classmethod
+    def _align(cls, pos):
+        return (pos + cls.ALIGN - 1) // cls.ALIGN * cls.ALIGN
+
+    def save(self, path):
+        """Writes the store as one file: magic, JSON header, then 64-byte aligned raw arrays."""
+        layout, chunks, pos = {}, [], 0
+        for key in self.ARRAYS:
+            arr = np.ascontiguousarray(getattr(self, key))
+            pos = self._align(pos)
+            layout[key] = [arr.dtype.str, int(arr.size), pos]
+            chunks.append((pos, arr))
+            pos += arr.nbytes
+        
+        header = json.dumps({'names': self.names, 'systems': self.systems, 'year': self.year, 'arrays': layout}).encode('utf-8')
+        data_start = self._align(len(self.MAGIC) + 8 + len(header))
+        with open(path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            for offset, arr in chunks:
+                f.seek(data_start + offset)
+                f.write(arr.tobytes())
+            f.truncate(data_start + pos)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-maps a saved store. Arrays are zero-copy views into the page cache."""
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a VSD index (version {CACHE_VERSION})")
+            header_len = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(header_len))
+        
+        buf = np.memmap(path, dtype=np.uint8, mode='r')
+        data_start = cls._align(len(cls.MAGIC) + 8 + header_len)
+        arrays = {}
+        for key in cls.ARRAYS:
+            dtype, size, offset = header['arrays'][key]
+            dtype = np.dtype(dtype)
+            start = data_start + offset
+            arrays[key] = buf[start:start + size * dtype.itemsize].view(dtype)
+        return cls(header['names'], header['systems'], arrays, header['year'])
+
+    def code_at(self, code_id):
+        return self.code_blob[self.code_offsets[code_id]:self.code_offsets[code_id + 1]].tobytes().decode('utf-8')
+
+    def find_code(self, code):
+        """Binary search over the sorted interned codes. Returns the code id or -1."""
+        target = str(code).strip().encode('utf-8')
+        blob, offsets = self.code_blob, self.code_offsets
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if blob[offsets[mid]:offsets[mid + 1]].tobytes() < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(offsets) - 1 and blob[offsets[lo]:offsets[lo + 1]].tobytes() == target:
+            return lo
+        return -1
+
+    def system_of(self, code):
+        code_id = self.find_code(code)
+        return self.systems[self.code_system[code_id]] if code_id >= 0 else None
+
+    def count(self, name_id, valid=True, year=None):
+        if valid and year is not None and year != self.year:
+            return len(self.code_ids(name_id, year=year))
+        offsets = self.valid_offsets if valid else self.vs_offsets
+        return int(offsets[name_id + 1]) - int(offsets[name_id])
+
+    def code_ids(self, name_id, valid=True, as_of=None, year=None):
+        """
+        Code ids of a value set: valid at day `as_of`, all of them (valid=False), or valid
+        for the MY (or another `year`). Every variant touches only the value set's own k rows.
+        """
+        start, end = int(self.vs_offsets[name_id]), int(self.vs_offsets[name_id + 1])
+        if as_of is not None:
+            day = day_number(as_of)
+            keep = (self.vs_effective[start:end] <= day) & (self.vs_expiration[start:end] >= day)
+            return self.vs_codes[start:end][keep]
+        if not valid:
+            return self.vs_codes[start:end]
+        if year is not None and year != self.year:
+            if YEAR_BASE <= year < YEAR_BASE + YEAR_SPAN:
+                keep = (self.vs_years[start:end] >> np.uint64(year - YEAR_BASE)) & np.uint64(1) == 1
+            else:
+                # Outside the bitmap window: fall back to the raw intervals
+                keep = (self.vs_effective[start:end] <= day_number(datetime(year, 12, 31))) & \
+                       (self.vs_expiration[start:end] >= day_number(datetime(year, 1, 1)))
+            return self.vs_codes[start:end][keep]
+        return self.vs_codes[self.valid_rows[self.valid_offsets[name_id]:self.valid_offsets[name_id + 1]]]
+
+    def codes(self, name_id, valid=True, as_of=None, year=None):
+        return [self.code_at(i) for i in self.code_ids(name_id, valid, as_of, year).tolist()]
+
+    def random_code(self, name_id, valid=True, as_of=None, year=None, rng=random):
+        """Picks one code without materialising the whole value set."""
+        if as_of is not None or (valid and year is not None and year != self.year):
+            ids = self.code_ids(name_id, as_of=as_of, year=year)
+            return self.code_at(int(ids[rng.randrange(len(ids))])) if len(ids) else None
+        
+        if valid:
+            start, end = int(self.valid_offsets[name_id]), int(self.valid_offsets[name_id + 1])
+            if start == end:
+                return None
+            return self.code_at(int(self.vs_codes[self.valid_rows[rng.randrange(start, end)]]))
+        
+        start, end = int(self.vs_offsets[name_id]), int(self.vs_offsets[name_id + 1])
+        if start == end:
+            return None
+        return self.code_at(int(self.vs_codes[rng.randrange(start, end)]))
+
+    def sample(self, name_id, n, rng, valid=True, year=None):
+        """
+        Draws n codes in one vectorized step. Returns (codes, systems) object arrays,
+        or None when the requested view of the value set is empty.
+        """
+        ids = self.code_ids(name_id, valid=valid, year=year)
+        if not len(ids):
+            return None
+        picked = ids[rng.integers(0, len(ids), size=n)]
+        # Decode each distinct code once, then broadcast back to the n draws
+        uniq, inverse = np.unique(picked, return_inverse=True)
+        codes = np.array([self.code_at(i) for i in uniq.tolist()], dtype=object)[inverse]
+        systems = np.array(self.systems, dtype=object)[self.code_system[picked]]
+        return codes, systems
+
+    def nbytes(self):
+        return sum(getattr(self, key).nbytes for key in self.ARRAYS)
+
+class ValueSetNameResolver:
+    """
+    Fuzzy value-set name matcher built once at load time.
+    A trigram inverted index narrows the names containing the query, a length-bucketed
+    lookup finds names contained in the query, and resolved aliases are kept in an LRU,
+    so repeated misses like "Outpatient" or "Diagnosis" cost a single cache hit.
+    """
+    NGRAM = 3
+
+    def __init__(self, names, cache_size=4096):
+        # `names` order is the tie-breaker between equally short matches
+        self.names = names
+        self.rank = {name: i for i, name in enumerate(names)}
+        self.lengths = sorted({len(name) for name in names})
+        self.postings = {}
+        for i, name in enumerate(names):
+            for gram in self._grams(name):
+                self.postings.setdefault(gram, []).append(i)
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    @classmethod
+    def _grams(cls, text):
+        return {text[j:j + cls.NGRAM] for j in range(len(text) - cls.NGRAM + 1)}
+
+    def _names_containing(self, key):
+        if len(key) < self.NGRAM:
+            return [i for i, name in enumerate(self.names) if key in name]
+        
+        postings = [self.postings.get(gram) for gram in self._grams(key)]
+        if any(p is None for p in postings):
+            return []
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+            if not candidates:
+                return []
+        # Trigram overlap is necessary but not sufficient; confirm the substring
+        return [i for i in candidates if key in self.names[i]]
+
+    def _names_within(self, key):
+        found = []
+        for length in self.lengths:
+            if length > len(key):
+                break
+            for j in range(len(key) - length + 1):
+                i = self.rank.get(key[j:j + length])
+                if i is not None:
+                    found.append(i)
+        return found
+
+    def _resolve(self, key):
+        """Returns the shortest name that contains `key` or is contained in it, else None."""
+        matches = set(self._names_containing(key))
+        matches.update(self._names_within(key))
+        if not matches:
+            return None
+        return self.names[min(matches, key=lambda i: (len(self.names[i]), i))]
+
+def _candidate_sheets(sheet_names):
+    """Sheet scan order: traditional index 3, then well-known names, then everything else."""
+    order = []
+    # 1. Try traditional integer index (Sheet 4 / Index 3)
+    if len(sheet_names) > 3:
+        order.append(sheet_names[3])
+    # 2. Try looking for sheet by name (like 'Value Sets to Codes')
+    for target in VSD_SHEET_NAMES:
+        order.extend(sheet for sheet in sheet_names if target.lower() in sheet.lower())
+    # 3. Last scan: Check ALL sheets
+    order.extend(sheet_names)
+    return list(dict.fromkeys(order))
+
+def _map_columns(header):
+    """
+    Maps key columns to their positions in a header row.
+    Returns None unless both a value set name and a code column are present.
+    """
+    columns = {}
+    for idx, cell in enumerate(header):
+        l_col = str(cell).lower().strip() if cell is not None else ''
+        if not l_col:
+            continue
+        # setdefault: the first matching column wins (e.g. 'Value Set Name' before 'Value Set OID')
+        if 'value set name' in l_col or ('value set' in l_col and 'name' not in l_col):
+            columns.setdefault('name', idx)
+        elif l_col == 'code':
+            columns.setdefault('code', idx)
+        elif 'effective' in l_col:
+            columns.setdefault('effective', idx)
+        elif 'expiration' in l_col:
+            columns.setdefault('expiration', idx)
+        elif 'system' in l_col and 'oid' not in l_col and 'version' not in l_col:
+            columns.setdefault('system', idx)
+    
+    if 'name' in columns and 'code' in columns:
+        return columns
+    return None
+
+def _find_header(rows):
+    """Consumes up to HEADER_SCAN_ROWS rows looking for the header. Returns (index, column map)."""
+    for idx, row in enumerate(itertools.islice(rows, HEADER_SCAN_ROWS)):
+        columns = _map_columns(row)
+        if columns:
+            return idx, columns
+    return None
+
+# Warnings already printed by this process (loaders run once per VSD and per worker)
+_warned = set()
+
+def _warn_once(message):
+    if message not in _warned:
+        _warned.add(message)
+        print(message)
+
+def _records(rows, columns):
+    """Normalises raw rows into (name, code, system, effective, expiration) records."""
+    name_col, code_col = columns['name'], columns['code']
+    sys_col, eff_col, exp_col = columns.get('system'), columns.get('effective'), columns.get('expiration')
+    if sys_col is None:
+        _warn_once("[WARN] 'Code System' column not found in VSD header; codes are loaded with system 'Unknown'")
+    
+    def cell(row, col):
+        if col is None or col >= len(row):
+            return None
+        value = row[col]
+        return None if value == '' else value
+    
+    for row in rows:
+        name, code = cell(row, name_col), cell(row, code_col)
+        if name is None or code is None:
+            continue
+        name, code = str(name).strip(), str(code).strip()
+        if not name or not code:
+            continue
+        system = cell(row, sys_col)
+        yield name, code, str(system) if system is not None else None, cell(row, eff_col), cell(row, exp_col)
+
+def stream_vsd_rows(vsd_path):
+    """
+    Streams (name, code, system, effective, expiration) records from an .xlsx or .csv VSD.
+    Workbooks are opened once in read-only mode; the sheet and header row are detected
+    on the fly and rows are yielded without building intermediate DataFrames.
+    """
+    if os.path.splitext(vsd_path)[1].lower() == '.csv':
+        with open(vsd_path, newline='', encoding='utf-8-sig') as f:
+            rows = csv.reader(f)
+            found = _find_header(rows)
+            if found is None:
+                raise ValueError(f"Could not locate Value Set Name / Code headers in {vsd_path}")
+            yield from _records(rows, found[1])
+        return
+    
+    wb = openpyxl.load_workbook(vsd_path, read_only=True, data_only=True)
+    try:
+        sheet_names = wb.sheetnames
+        for sheet in _candidate_sheets(sheet_names):
+            rows = wb[sheet].iter_rows(values_only=True)
+            found = _find_header(rows)
+            if found is None:
+                continue
+            header_idx, columns = found
+            print(f"[OK] Discovered VSD in sheet: '{sheet}' (headers at row {header_idx + 1})")
+            # `rows` resumes right after the header row
+            yield from _records(rows, columns)
+            return
+    finally:
+        wb.close()
+    
+    raise ValueError(f"Could not locate a valid Value Set sheet in {vsd_path}. Checked sheets: {sheet_names}")
 
 class VSDManager:
-    def __init__(self, vsd_path, measurement_year=2026):
+    def __init__(self, vsd_path, measurement_year=2026, cache_dir=None, use_cache=True, seed=None):
         self.vsd_path = vsd_path
         self.measurement_year = measurement_year
-        self.vsd_map = {}
+        self.store = None
         self.unique_names = []
+        self.reseed(seed)
         
         print(f"Loading VSD from {vsd_path}...")
         
-        # Try to smart-load the VSD
-        self.df = self._smart_load_vsd()
-        
-        # Normalize column names
-        self._normalize_columns()
-        
-        # Parse date columns if they exist
-        self._parse_dates()
-        
-        print(f"VSD loaded with {len(self.df)} code entries.")
+        # ⚡ Persistent Index: Skip Excel parsing entirely when this exact file/year was indexed before
+        self.cache_path = self._cache_path(cache_dir) if use_cache else None
+        if self.cache_path and self._load_cache():
+            print(f"⚡ Memory-mapped VSD index from cache: {self.cache_path}")
+        else:
+            # Try to smart-load the VSD in a single streaming pass
+            columns = self._smart_load_vsd()
+            print(f"VSD loaded with {len(columns['codes'])} code entries.")
+            
+            # ⚡ Optimization: Pre-compute lookups
+            self._build_fast_lookup(columns)
+            
+            if self.cache_path:
+                self._save_cache()
         
-        # ⚡ Optimization: Pre-compute lookups
-        self._build_fast_lookup()
+        self._index_names()
+        self._code_system_cache = {}
         
         # Filter for valid codes (count based on our optimized map)
-        self.valid_codes_count = sum(len(codes) for codes in self.vsd_map.values())
-        print(f"Valid codes for MY {measurement_year}: {self.valid_codes_count}")
+        self.valid_codes_count = len(self.store.valid_rows)
+        print(f"Valid codes for MY {measurement_year}: {self.valid_codes_count} ({self.store.nbytes() / 1e6:.1f} MB index)")
 
-    def _smart_load_vsd(self):
-        """Attempts to find the correct sheet and columns."""
-        xl = pd.ExcelFile(self.vsd_path)
-        sheet_names = xl.sheet_names
+    def reseed(self, seed=None):
+        """Resets the default streams for random code draws (None = unseeded)."""
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Bulk draws (sample_codes) continue one generator across calls, like self.rng
+        self._np_rng = np.random.default_rng(seed)
+
+    def _cache_path(self, cache_dir=None):
+        """
+        Resolves the on-disk index path for this VSD.
+        The key is the file's content hash plus the measurement year, so edits or a new
+        year never pick up a stale index.
+        """
+        if not os.path.exists(self.vsd_path):
+            return None
+        if cache_dir is None:
+            cache_dir = os.getenv('VSD_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(self.vsd_path)), '.vsd_cache')
         
-        # 1. Try traditional integer index (Sheet 4 / Index 3)
-        if len(sheet_names) > 3:
+        digest = hashlib.sha256()
+        with open(self.vsd_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        
+        stem = os.path.splitext(os.path.basename(self.vsd_path))[0]
+        return os.path.join(cache_dir, f"{stem}_MY{self.measurement_year}_{digest.hexdigest()[:20]}.v{CACHE_VERSION}.idx")
+
+    def _save_cache(self):
+        """Persists the store, then re-opens it memory-mapped so this process shares pages too."""
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            self.store.save(tmp_path)
+            # Atomic swap so concurrent workers never read a half-written index
+            os.replace(tmp_path, self.cache_path)
+            self.store = ValueSetStore.open(self.cache_path)
+            print(f"   [OK] Saved VSD index cache: {self.cache_path}")
+        except OSError as e:
+            print(f"[WARN] Could not write VSD cache ({e}). Continuing without it.")
+            return
+        self._prune_cache()
+
+    def _prune_cache(self):
+        """
+        Deletes older indexes of the same source file and year (e.g. from a previous upload
+        of VSD_Manual_Upload.xlsx); every new file content would otherwise leave one behind.
+        """
+        folder, name = os.path.split(self.cache_path)
+        prefix = name[:name.rindex('_') + 1]  # "<stem>_MY<year>_"
+        for path in glob.glob(os.path.join(glob.escape(folder), glob.escape(prefix) + '*.idx')):
+            if os.path.basename(path) == name:
+                continue
             try:
-                df = pd.read_excel(self.vsd_path, sheet_name=3)
-                if self._has_required_columns(df):
-                    return df
-            except:
-                pass
-
-        # 2. Try looking for sheet by name (like 'Value Sets to Codes')
-        target_sheets = ['Value Set to Codes', 'Value Set Directory', 'Value Sets', 'Codes']
-        for target in target_sheets:
-            for sheet in sheet_names:
-                if target.lower() in sheet.lower():
-                    # print(f"Checking sheet: '{sheet}'...")
-                    found_df = self._scan_sheet_for_headers(sheet)
-                    if found_df is not None:
-                        print(f"[OK] Discovered VSD in sheet: '{sheet}'")
-                        return found_df
-
-        # 3. Last scan: Check ALL sheets
-        print("Scanning all sheets for VSD structure...")
-        for sheet in sheet_names:
-            found_df = self._scan_sheet_for_headers(sheet)
-            if found_df is not None:
-                print(f"[OK] Structure matched in sheet: '{sheet}'")
-                return found_df
-        
-        raise ValueError(f"Could not locate a valid Value Set sheet in {self.vsd_path}. Checked sheets: {sheet_names}")
-
-    def _scan_sheet_for_headers(self, sheet_name):
-        """Scans the first 20 rows of a sheet to find the header row."""
+                os.remove(path)
+            except OSError:
+                pass  # Still mapped by another process (Windows); the next save retries
+
+    def _load_cache(self):
+        """Maps the saved store from disk. Returns False on a miss or unreadable cache."""
+        if not os.path.exists(self.cache_path):
+            return False
         try:
-            # Read first 20 rows without header
-            preview = pd.read_excel(self.vsd_path, sheet_name=sheet_name, nrows=20, header=None)
-            
-            # Iterate through rows to find one with "Value Set Name" or similar
-            for idx, row in preview.iterrows():
-                row_str = row.astype(str).str.lower().tolist()
-                
-                # Check if this row looks like a header
-                has_name = any('value set name' in s or 'value set' in s for s in row_str)
-                has_code = any('code' in s for s in row_str)
-                
-                if has_name and has_code:
-                    # Found the header at row `idx`
-                    # Reload the sheet with this header row
-                    print(f"   Found headers at row {idx+1}")
-                    return pd.read_excel(self.vsd_path, sheet_name=sheet_name, header=idx)
-            
-            return None
-        except Exception as e:
-            return None
+            self.store = ValueSetStore.open(self.cache_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARN] Ignoring unreadable VSD cache {self.cache_path}: {e}")
+            return False
+        return True
+
+    def _index_names(self):
+        """Only value sets with codes valid for the MY take part in name resolution."""
+        non_empty = np.flatnonzero(np.diff(self.store.valid_offsets) > 0).tolist()
+        self.unique_names = [self.store.names[i] for i in non_empty]
+        self.resolver = ValueSetNameResolver(self.unique_names)
+        # Other years resolve among their own non-empty value sets (built on first use)
+        self._year_resolvers = {}
         
-        return None
-
-    def _has_required_columns(self, df):
-        """Check if dataframe has something looking like a value set name and code."""
-        cols = [c.lower() for c in df.columns]
-        has_name = any('value set' in c or 'valueset' in c for c in cols)
-        has_code = any('code' in c for c in cols)
-        return has_name and has_code
-
-    def _normalize_columns(self):
-        """Normalize key columns to standard names."""
-        col_map = {}
-        for col in self.df.columns:
-            l_col = col.lower().strip()
-            if 'value set name' in l_col:
-                col_map[col] = 'Value Set Name'
-            elif 'value set' in l_col and 'name' not in l_col: # e.g. "Value Set"
-                col_map[col] = 'Value Set Name'
-            elif l_col == 'code':
-                col_map[col] = 'Code'
-            elif 'effective' in l_col:
-                col_map[col] = 'Effective Date'
-            elif 'expiration' in l_col:
-                col_map[col] = 'Expiration Date'
-        
-        if col_map:
-            self.df.rename(columns=col_map, inplace=True)
-
-        # ⚡ CRITICAL FIX: Handle duplicate columns (e.g. if 'Value Set Name' appears twice)
-        # This prevents "DataFrame object has no attribute 'str'" errors
-        self.df = self.df.loc[:, ~self.df.columns.duplicated()]
-            
-        if 'Value Set Name' not in self.df.columns:
-            raise KeyError("Could not normalize column headers. Expected 'Value Set Name' or similar found: " + str(self.df.columns))
-            
-        self.df['Value Set Name'] = self.df['Value Set Name'].astype(str).str.strip()
-    
-    def _parse_dates(self):
-        """Parse effective and expiration date columns."""
-        date_columns = ['Effective Date', 'Expiration Date', 'EffectiveDate', 'ExpirationDate']
-        
-        for col in date_columns:
-            if col in self.df.columns:
-                try:
-                    self.df[col] = pd.to_datetime(self.df[col], errors='coerce')
-                except:
-                    pass
-
-    def _build_fast_lookup(self):
-        """Build dictionary-based lookups for O(1) performance."""
-        print("Building fast VSD lookup cache...")
-        # 1. Filter valid codes for MY once
-        my_start = datetime(self.measurement_year, 1, 1)
-        my_end = datetime(self.measurement_year, 12, 31)
+        # ⚡ Pattern Cache: per-visit pattern resolution becomes a dictionary hit
+        self._match_pattern = lru_cache(maxsize=1024)(self._scan_pattern)
+        for pattern in COMMON_PATTERNS:
+            self._match_pattern(pattern)
+
+    def _resolver_for(self, year=None):
+        """Fuzzy name resolver over the value sets with codes valid in `year` (default: the MY)."""
+        if year is None or year == self.measurement_year:
+            return self.resolver
+        if year not in self._year_resolvers:
+            names = [name for i, name in enumerate(self.store.names) if self.store.count(i, year=year)]
+            self._year_resolvers[year] = ValueSetNameResolver(names)
+        return self._year_resolvers[year]
+
+    def _scan_pattern(self, pattern):
+        """Returns (matches in name order, matches shortest-first) for a regex pattern."""
+        regex = re.compile(pattern, flags=re.IGNORECASE)
+        matches = tuple(name for name in self.unique_names if regex.search(name))
+        return matches, tuple(sorted(matches, key=len))
+
+    def _smart_load_vsd(self):
+        """
+        Loads the VSD rows into compact column buffers.
+        Parquet is read column-wise; xlsx and CSV are streamed in a single pass.
+        """
+        if os.path.splitext(self.vsd_path)[1].lower() == '.parquet':
+            return self._load_parquet()
+        return self._stream_columns(stream_vsd_rows(self.vsd_path))
+
+    def _load_parquet(self):
+        """Vectorized load of a (normalised) Parquet VSD, e.g. from scripts/convert_vsd.py."""
+        try:
+            df = pd.read_parquet(self.vsd_path).reset_index(drop=True)
+        except ImportError as e:
+            raise ImportError(f"Reading Parquet VSD files requires pyarrow ({e})")
         
-        # Make a copy to avoid SettingWithCopy and ensure we don't mutate original if needed elsewhere
-        valid_df = self.df.copy()
+        columns = _map_columns(df.columns)
+        if not columns:
+            raise KeyError("Could not normalize column headers. Expected 'Value Set Name' or similar found: " + str(list(df.columns)))
         
-        eff_col = 'Effective Date' if 'Effective Date' in self.df.columns else 'EffectiveDate'
-        exp_col = 'Expiration Date' if 'Expiration Date' in self.df.columns else 'ExpirationDate'
+        def column(key):
+            if key not in columns:
+                return pd.Series(None, index=df.index, dtype=object)
+            return df.iloc[:, columns[key]]
         
-        if eff_col in valid_df.columns:
-            valid_df = valid_df[valid_df[eff_col].isna() | (valid_df[eff_col] <= my_end)]
-        if exp_col in valid_df.columns:
-            valid_df = valid_df[valid_df[exp_col].isna() | (valid_df[exp_col] >= my_start)]
-            
-        # 2. Group by Value Set Name (lowercase for case-insensitive lookup)
-        # Store list of codes as strings to ensure consistency
-        # Optimization: use aggregation for speed
-        grouped = valid_df.groupby(valid_df['Value Set Name'].str.lower())
-        self.vsd_map = grouped['Code'].apply(list).to_dict()
-        
-        # 3. Cache Code -> System for smart routing
-        # Ensure codes are strings
-        valid_df['Code'] = valid_df['Code'].astype(str).str.strip()
-        # Drop duplicates to keep map size reasonable (assuming System is consistent for a Code)
-        unique_codes = valid_df.drop_duplicates(subset=['Code'])
-        # Handle case where Code System column might be missing or named differently
-        sys_col = next((c for c in valid_df.columns if 'system' in c.lower() and 'oid' not in c.lower() and 'version' not in c.lower()), 'Code System')
-        
-        if sys_col in valid_df.columns:
-            self.code_to_system = unique_codes.set_index('Code')[sys_col].to_dict()
-        else:
-            print(f"[WARN] 'Code System' column not found in VSD keys: {valid_df.columns.tolist()}")
-            self.code_to_system = {}
+        names, codes = column('name'), column('code')
+        keep = names.notna() & codes.notna()
+        names = names[keep].astype(str).str.strip().str.lower()
+        codes = codes[keep].astype(str).str.strip()
+        rows = names.index[((names != '') & (codes != '')).to_numpy()]
+        systems = column('system')[rows]
         
-        # 4. Cache unique names for regex search
-        self.unique_names = list(self.vsd_map.keys())
-        print(f"   [OK] Cached {len(self.unique_names)} value sets, {len(valid_df)} valid codes, {len(self.code_to_system)} system lookups")
+        return {
+            'names': names[rows].to_numpy(dtype=str),
+            'codes': codes[rows].to_numpy(dtype=str),
+            'systems': systems.where(systems.notna() & (systems.astype(str) != ''), 'Unknown').astype(str).to_numpy(dtype=str),
+            'effective': self._day_numbers(column('effective')[rows], OPEN_START),
+            'expiration': self._day_numbers(column('expiration')[rows], OPEN_END)
+        }
+
+    def _stream_columns(self, records):
+        """
+        Streams VSD records into compact column buffers.
+        Names, systems and date cells repeat heavily, so they are interned as they arrive
+        and each distinct value is converted only once at the end.
+        """
+        names, systems, effective, expiration = {}, {}, {}, {}
+        name_ids, sys_ids, eff_ids, exp_ids, codes = [], [], [], [], []
+        for name, code, system, eff, exp in records:
+            codes.append(code)
+            name_ids.append(names.setdefault(name.lower(), len(names)))
+            sys_ids.append(systems.setdefault(system if system is not None else 'Unknown', len(systems)))
+            eff_ids.append(effective.setdefault(eff, len(effective)))
+            exp_ids.append(expiration.setdefault(exp, len(expiration)))
+
+        def expand(table, ids, convert=None):
+            values = list(table)
+            values = convert(values) if convert else np.array(values, dtype=str)
+            return values[np.array(ids, dtype=np.int64)] if ids else values[:0]
+
+        return {
+            'names': expand(names, name_ids),
+            'codes': np.array(codes, dtype=str),
+            'systems': expand(systems, sys_ids),
+            'effective': expand(effective, eff_ids, lambda v: self._day_numbers(v, OPEN_START)),
+            'expiration': expand(expiration, exp_ids, lambda v: self._day_numbers(v, OPEN_END))
+        }
+
+    def _day_numbers(self, values, missing):
+        """Converts raw date cells to int32 day numbers, using `missing` for blanks."""
+        days = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype='datetime64[D]')
+        out = days.astype(np.int64)
+        out[np.isnat(days)] = missing
+        return out.astype(np.int32)
+
+    def _build_fast_lookup(self, columns):
+        """Build the compact array-backed store for O(1) performance."""
+        print("Building fast VSD lookup cache...")
+        # Validity intervals per row: the store derives MY and per-year validity
+        self.store = ValueSetStore.from_rows(
+            columns['names'], columns['codes'], columns['systems'],
+            columns['effective'], columns['expiration'], self.measurement_year
+        )
+        print(f"   [OK] Cached {len(self.store.names)} value sets, {len(self.store.valid_rows)} valid codes, {len(self.store.code_offsets) - 1} unique codes")
 
     def get_code_system(self, code):
         """
         Get the Code System (e.g. CPT, ICD-10-CM) for a given code.
         Returns 'Unknown' if not found.
         """
-        return self.code_to_system.get(str(code).strip(), 'Unknown')
+        code = str(code).strip()
+        system = self._code_system_cache.get(code)
+        if system is None:
+            system = self.store.system_of(code) or 'Unknown'
+            # Bounded memo: the engine asks about the same few hundred codes over and over
+            if len(self._code_system_cache) < 100000:
+                self._code_system_cache[code] = system
+        return system
+
+    def _resolve_name_id(self, value_set_name, year=None, valid=True):
+        """Resolves a value set name to its store id using exact match with fuzzy fallback."""
+        key = value_set_name.lower().strip()
+        
+        # 1. Try Exact Match (only value sets with codes valid for the requested year, unless dates are ignored)
+        name_id = self.store.name_index.get(key)
+        if name_id is not None and self.store.count(name_id, valid=valid, year=year):
+            return name_id
+        
+        # 2. ⚡ Fuzzy Fallback: a name that contains the requested name, or vice versa
+        # The resolver prioritizes the shortest match (usually the most generic one)
+        match = self._resolver_for(year if valid else None).resolve(key)
+        return self.store.name_index[match] if match is not None else None
 
-    def get_codes(self, value_set_name, validate_dates=True):
+    def get_codes(self, value_set_name, validate_dates=True, as_of=None, year=None):
         """
         Returns a list of codes for a given value set name.
         Uses fast O(1) lookup with fuzzy fallback.
+        By default only codes valid for the measurement year are returned; pass `year`
+        for another measurement year, `as_of` for codes valid on a specific date,
+        or validate_dates=False for all codes.
         """
-        key = value_set_name.lower().strip()
-        
-        # 1. Try Exact Match
-        codes = self.vsd_map.get(key)
-        
-        # 2. ⚡ Fuzzy Fallback (Case-insensitive search in unique names)
-        if codes is None:
-            # Look for a name that contains the requested name, or vice versa
-            matches = [n for n in self.unique_names if key in n or n in key]
-            if matches:
-                # Prioritize shortest match (usually the most generic one)
-                matches.sort(key=len)
-                key = matches[0]
-                codes = self.vsd_map.get(key)
-                # print(f"    ✨ Fuzzy-matched '{value_set_name}' to '{key}'")
-        
-        # 3. Final extraction
-        if codes is not None:
-            if validate_dates: return codes
-            # Slow fallback for non-date-validated (rare)
-            matches_df = self.df[self.df['Value Set Name'].str.lower() == key]
-            return matches_df['Code'].tolist()
-            
-        return []
+        name_id = self._resolve_name_id(value_set_name, year, validate_dates)
+        if name_id is None:
+            return []
+        return self.store.codes(name_id, valid=validate_dates, as_of=as_of, year=year)
 
-    def get_random_code(self, value_set_name, validate_dates=True):
+    def get_random_code(self, value_set_name, validate_dates=True, as_of=None, year=None, rng=None):
         """
         Returns a single random code for a value set.
+        `rng` is a random.Random stream (default: this manager's seeded stream).
         """
-        import random
-        codes = self.get_codes(value_set_name, validate_dates=validate_dates)
-        if not codes:
+        rng = rng or self.rng
+        name_id = self._resolve_name_id(value_set_name, year, validate_dates)
+        if name_id is None:
+            return None
+        code = self.store.random_code(name_id, valid=validate_dates, as_of=as_of, year=year, rng=rng)
+        if code is None and (validate_dates or as_of is not None):
             # Try without date validation as fallback
-            if validate_dates:
-                codes = self.get_codes(value_set_name, validate_dates=False)
-        
-        return str(random.choice(codes)) if codes else None
+            code = self.store.random_code(name_id, valid=False, rng=rng)
+        return code
+    
+    def sample_codes(self, value_set_name, n, rng=None, validate_dates=True, year=None):
+        """
+        Vectorized bulk version of get_random_code + get_code_system.
+        Returns (codes, systems) as aligned NumPy object arrays of length n from a single
+        draw of `rng` (a numpy Generator or seed; default: the manager's own stream, which
+        advances across calls); entries are None if the set is unknown.
+        """
+        rng = self._np_rng if rng is None else np.random.default_rng(rng)
+        empty = np.full(n, None, dtype=object)
+        name_id = self._resolve_name_id(value_set_name, year, validate_dates)
+        if name_id is None:
+            return empty, empty.copy()
+        drawn = self.store.sample(name_id, n, rng, valid=validate_dates, year=year)
+        if drawn is None and validate_dates:
+            # Same fallback as get_random_code: ignore dates rather than return nothing
+            drawn = self.store.sample(name_id, n, rng, valid=False)
+        return drawn if drawn is not None else (empty, empty.copy())
     
     def find_value_sets(self, pattern, filter_empty=True):
         """
         Find value set names that match a pattern efficiently.
         """
-        # Search in cached unique names instead of dataframe
-        # This is much faster
-        matches = [name for name in self.unique_names if re.search(pattern, name, flags=re.IGNORECASE)]
-        
-        if filter_empty:
-            matches = [name for name in matches if self.get_codes(name)]
-            
-        return matches
+        # Cached per pattern. unique_names only holds value sets with MY-valid codes,
+        # so matches are already non-empty whether or not filter_empty is set.
+        return list(self._match_pattern(pattern)[0])
 
-    def get_random_code_from_pattern(self, pattern, validate_dates=True):
+    def get_random_code_from_pattern(self, pattern, validate_dates=True, year=None, rng=None):
         """
         Search for a value set matching a pattern and return a random code from it.
         Useful for generic needs like 'Outpatient' or 'Diagnosis'.
         """
-        matches = self.find_value_sets(pattern)
-        if not matches:
-            return None
-            
         # Prioritize shorter names as they are often more 'generic'
-        matches.sort(key=len)
-        return self.get_random_code(matches[0], validate_dates=validate_dates)
+        by_length = self._match_pattern(pattern)[1]
+        if not by_length:
+            return None
+        return self.get_random_code(by_length[0], validate_dates=validate_dates, year=year, rng=rng)
@@ -0,0 +1,232 @@
+import os
+import sys
+import random
+import tempfile
+import threading
+import argparse
+import numpy as np
+from functools import lru_cache
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+# Methods the server answers on behalf of its single resident VSDManager
+SERVED_METHODS = {'get_codes', 'get_code_system', 'get_code_systems', 'find_value_sets', 'describe'}
+
+def default_address():
+    """Named pipe on Windows, Unix socket in the temp dir elsewhere (override with VSD_SERVER_ADDRESS)."""
+    address = os.getenv('VSD_SERVER_ADDRESS')
+    if address:
+        return address
+    if sys.platform == 'win32':
+        return r'\\.\pipe\hedis_vsd'
+    return os.path.join(tempfile.gettempdir(), 'hedis_vsd.sock')
+
+def default_key_file():
+    """Per-user key file (override with VSD_SERVER_KEY_FILE)."""
+    return os.getenv('VSD_SERVER_KEY_FILE') or os.path.join(os.path.expanduser('~'), '.hedis_vsd_key')
+
+def default_authkey(create=False):
+    """
+    Connection key: VSD_SERVER_KEY, else the per-user key file. Connections exchange pickles,
+    so the key is what keeps other local users from running code in the server: there is no
+    built-in fallback. The server creates the key file (0600, random) on first start;
+    clients without a key get a ValueError.
+    """
+    key = os.getenv('VSD_SERVER_KEY')
+    if key:
+        return key.encode('utf-8')
+    path = default_key_file()
+    if create and not os.path.exists(path):
+        import secrets
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+        except FileExistsError:
+            pass  # another server created it first
+    if not os.path.exists(path):
+        raise ValueError(f"No VSD server key: set VSD_SERVER_KEY or start the server once to create {path}")
+    if sys.platform != 'win32' and os.stat(path).st_mode & 0o077:
+        raise ValueError(f"VSD server key file {path} is readable by other users; chmod 600 it")
+    with open(path, 'r') as f:
+        key = f.read().strip()
+    if not key:
+        raise ValueError(f"VSD server key file {path} is empty")
+    return key.encode('utf-8')
+
+def file_signature(path):
+    """(size, mtime) of a file: a VSD replaced in place after the server loaded it no longer matches."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+class VSDServer:
+    """
+    Local VSD service: owns one loaded VSDManager and answers lookups for every
+    Flask worker and batch process, so memory stays flat as workers scale.
+    """
+
+    def __init__(self, vsd_path, measurement_year=2026, address=None, authkey=None):
+        from src.vsd import VSDManager
+        self.authkey = authkey or default_authkey(create=True)
+        # Taken before loading: a file changed during the load must not look current
+        self.signature = file_signature(vsd_path)
+        self.vsd = VSDManager(vsd_path, measurement_year=measurement_year)
+        self.address = address or default_address()
+
+    def _dispatch(self, method, args, kwargs):
+        if method not in SERVED_METHODS:
+            raise AttributeError(f"VSD server does not serve '{method}'")
+        if method == 'describe':
+            return {'vsd_path': os.path.abspath(self.vsd.vsd_path), 'signature': self.signature,
+                    'measurement_year': self.vsd.measurement_year}
+        if method == 'get_code_systems':
+            return [self.vsd.get_code_system(code) for code in args[0]]
+        return getattr(self.vsd, method)(*args, **kwargs)
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send(('ok', self._dispatch(method, args, kwargs)))
+                except Exception as e:
+                    conn.send(('error', f"{type(e).__name__}: {e}"))
+
+    def serve_forever(self):
+        # A stale socket file from a crashed server would block bind()
+        if not self.address.startswith('\\\\') and os.path.exists(self.address):
+            os.unlink(self.address)
+
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"📡 VSD server listening on {self.address} (MY {self.vsd.measurement_year})")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"⚠️  Rejected VSD client: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+class VSDClient:
+    """
+    Drop-in replacement for VSDManager backed by a running VSDServer.
+    Lookups go over the socket; random draws happen locally against the (cached) code
+    lists so they follow this process's RNG exactly like an in-process VSDManager.
+    """
+
+    def __init__(self, address=None, authkey=None, cache_size=512, seed=None):
+        self.address = address or default_address()
+        self.reseed(seed)
+        self._conn = Client(self.address, authkey=authkey or default_authkey())
+        self._lock = threading.Lock()
+        info = self._call('describe')
+        self.vsd_path = info['vsd_path']
+        self.signature = info['signature']
+        self.measurement_year = info['measurement_year']
+        self._codes = lru_cache(maxsize=cache_size)(self._fetch_codes)
+        self._patterns = lru_cache(maxsize=cache_size)(self._fetch_patterns)
+        self._code_system_cache = {}
+
+    def _call(self, method, *args, **kwargs):
+        with self._lock:
+            self._conn.send((method, args, kwargs))
+            status, result = self._conn.recv()
+        if status == 'error':
+            raise RuntimeError(f"VSD server error in {method}: {result}")
+        return result
+
+    def reseed(self, seed=None):
+        """Resets the default streams for random code draws (None = unseeded)."""
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Bulk draws (sample_codes) continue one generator across calls, like self.rng
+        self._np_rng = np.random.default_rng(seed)
+
+    def close(self):
+        self._conn.close()
+
+    def _fetch_codes(self, value_set_name, validate_dates, as_of, year):
+        return tuple(self._call('get_codes', value_set_name, validate_dates=validate_dates, as_of=as_of, year=year))
+
+    def _fetch_patterns(self, pattern):
+        return tuple(self._call('find_value_sets', pattern))
+
+    def get_code_system(self, code):
+        code = str(code).strip()
+        system = self._code_system_cache.get(code)
+        if system is None:
+            system = self._call('get_code_system', code)
+            if len(self._code_system_cache) < 100000:
+                self._code_system_cache[code] = system
+        return system
+
+    def get_codes(self, value_set_name, validate_dates=True, as_of=None, year=None):
+        return list(self._codes(value_set_name, validate_dates, as_of, year))
+
+    def get_random_code(self, value_set_name, validate_dates=True, as_of=None, year=None, rng=None):
+        codes = self._codes(value_set_name, validate_dates, as_of, year)
+        if not codes and (validate_dates or as_of is not None):
+            # Try without date validation as fallback
+            codes = self._codes(value_set_name, False, None, None)
+        return codes[(rng or self.rng).randrange(len(codes))] if codes else None
+
+    def sample_codes(self, value_set_name, n, rng=None, validate_dates=True, year=None):
+        rng = self._np_rng if rng is None else np.random.default_rng(rng)
+        codes = self._codes(value_set_name, validate_dates, None, year)
+        if not codes and validate_dates:
+            codes = self._codes(value_set_name, False, None, None)
+        if not codes:
+            empty = np.full(n, None, dtype=object)
+            return empty, empty.copy()
+
+        picked = np.array(codes, dtype=object)[rng.integers(0, len(codes), size=n)]
+        uniq = sorted(set(picked.tolist()))
+        missing = [c for c in uniq if c not in self._code_system_cache]
+        if missing:
+            self._code_system_cache.update(zip(missing, self._call('get_code_systems', missing)))
+        systems = np.array([self._code_system_cache[c] for c in picked.tolist()], dtype=object)
+        return picked, systems
+
+    def find_value_sets(self, pattern, filter_empty=True):
+        return list(self._patterns(pattern))
+
+    def get_random_code_from_pattern(self, pattern, validate_dates=True, year=None, rng=None):
+        matches = self._patterns(pattern)
+        if not matches:
+            return None
+        # Prioritize shorter names as they are often more 'generic'
+        return self.get_random_code(min(matches, key=len), validate_dates=validate_dates, year=year, rng=rng)
+
+def connect_if_serving(vsd_path, address=None):
+    """
+    Returns a VSDClient when a server is reachable and serves the current `vsd_path`
+    (same path, size and mtime as when the server loaded it), else None.
+    """
+    try:
+        client = VSDClient(address)
+    except (ValueError, AuthenticationError) as e:
+        print(f"⚠️  VSD server not usable ({e}); loading locally.")
+        return None
+    except (OSError, EOFError, ConnectionError):
+        return None
+    if client.vsd_path != os.path.abspath(vsd_path):
+        print(f"⚠️  VSD server serves {client.vsd_path}, not {vsd_path}; loading locally.")
+        client.close()
+        return None
+    if not os.path.exists(vsd_path) or client.signature != file_signature(vsd_path):
+        print(f"⚠️  {vsd_path} changed since the VSD server loaded it; loading locally (restart the server).")
+        client.close()
+        return None
+    return client
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Shared VSD lookup server for multi-process generation')
+    parser.add_argument('--vsd', default=os.getenv('VSD_PATH', 'data/VSD_MY2026.xlsx'), help='Path to VSD file')
+    parser.add_argument('--year', type=int, default=2026, help='Measurement year')
+    parser.add_argument('--address', help='Socket path / pipe name (default: VSD_SERVER_ADDRESS or temp dir)')
+    args = parser.parse_args()
+
+    VSDServer(args.vsd, measurement_year=args.year, address=args.address).serve_forever()
@@ -0,0 +1,186 @@
+import pickle
+import tempfile
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from openpyxl.utils.datetime import to_excel
+
+# Same cell formats pandas' Excel writer applies
+DATETIME_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+# First real date after Excel's phantom 1900-02-29
+EXCEL_LEAP_BUG = datetime(1900, 3, 1)
+# Data rows per sheet (1,048,576 minus the header); xlsxwriter silently drops the rest
+EXCEL_MAX_ROWS = 1048575
+
+def _write_early_datetime(worksheet, row, col, value, cell_format=None):
+    """Pre-1900-03-01 dates (age edge cases): keep the serials the openpyxl writer produced."""
+    if value < EXCEL_LEAP_BUG:
+        return worksheet.write_number(row, col, to_excel(value), cell_format or worksheet.default_date_format)
+    return None
+
+def _cell(value):
+    """Row value -> xlsxwriter-native value (None = leave the cell empty)."""
+    if value is None or value != value:  # None, NaN, NaT
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class StreamingSheet:
+    """
+    One table of a StreamingWorkbook. Rows are reduced to (column positions, values) as
+    they arrive and spooled to a temporary file in chunks, so memory no longer grows with
+    the row count; the worksheet is written from the spool on close, when every tab can be
+    added in name order. Tables without a known column order are buffered until close.
+    """
+    spool_rows = 5000
+
+    def __init__(self, workbook, name):
+        self.workbook = workbook
+        self.name = name
+        self.columns = None
+        self.rows = 0
+        self._buffer = None
+        self._positions = {}
+        self._spool = None
+        self._chunk = []
+        self._keys = {}
+
+    def __len__(self):
+        return self.rows + len(self._buffer or ())
+
+    def _next_row(self):
+        if self.rows >= EXCEL_MAX_ROWS:
+            raise ValueError(f"{self.name} exceeds Excel's {EXCEL_MAX_ROWS + 1:,}-row sheet limit; use the csv, parquet or sqlite output format")
+        self.rows += 1
+
+    def _open(self, columns=None):
+        # Spools are created on first data so empty tables never get a tab
+        self.columns = list(columns or self.workbook.columns_for(self.name) or ())
+        if not self.columns:
+            self._buffer = []
+            return
+        self._positions = {c: i for i, c in enumerate(self.columns)}
+        self._spool = tempfile.TemporaryFile()
+
+    def _add(self, positions, values):
+        self._next_row()
+        self._chunk.append((positions, values))
+        if len(self._chunk) >= self.spool_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._chunk:
+            # Rows sharing a key set share one positions tuple, which pickle stores once per chunk
+            pickle.dump(self._chunk, self._spool, protocol=pickle.HIGHEST_PROTOCOL)
+            self._chunk = []
+
+    def append(self, row):
+        if self._spool is None and self._buffer is None:
+            self._open()
+        if self._buffer is not None:
+            self._buffer.append(row)
+            return
+        keys = tuple(row)
+        known = self._keys.get(keys)
+        if known is None:
+            known = self._keys[keys] = (tuple(k for k in keys if k in self._positions),
+                                        tuple(self._positions[k] for k in keys if k in self._positions))
+        names, positions = known
+        self._add(positions, tuple(_cell(row[k]) for k in names))
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def write_frame(self, df):
+        """Adds a DataFrame's rows (batch-generated tables) without building row dicts."""
+        if df.empty:
+            return
+        if self._spool is None and self._buffer is None:
+            self._open()
+        if self._buffer is not None:
+            self._buffer.extend(df.to_dict('records'))
+            return
+        present = [c for c in df.columns if c in self._positions]
+        positions = tuple(self._positions[c] for c in present)
+        for values in zip(*(df[c].tolist() for c in present)):
+            self._add(positions, tuple(map(_cell, values)))
+
+    def close(self):
+        if self._buffer:
+            # Column order = first appearance across all rows (as pd.DataFrame(rows) would)
+            rows, self._buffer = self._buffer, None
+            self._open(dict.fromkeys(col for row in rows for col in row))
+            self.extend(rows)
+        self._flush()
+
+    def write_to(self, book, header_format):
+        """Adds this table's worksheet to book and streams the spooled rows into it."""
+        worksheet = book.add_worksheet(self.name[:31])
+        for date_type in (datetime, pd.Timestamp):
+            worksheet.add_write_handler(date_type, _write_early_datetime)
+        worksheet.write_row(0, 0, self.columns, header_format)
+        write = worksheet.write
+        r = 0
+        self._spool.seek(0)
+        while True:
+            try:
+                chunk = pickle.load(self._spool)
+            except EOFError:
+                break
+            for positions, values in chunk:
+                r += 1
+                for i, value in zip(positions, values):
+                    if value is not None:
+                        write(r, i, value)
+        self._spool.close()
+        self._spool = None
+
+class StreamingWorkbook:
+    """
+    Streaming replacement for pd.ExcelWriter(engine='openpyxl') + DataFrame.to_excel.
+    sheet(name) hands out append-only StreamingSheets (list-like, so they can stand in
+    for data_store row lists); columns_for(name) supplies each table's column order.
+    Worksheets are added on close in name order, matching the previous sorted output.
+    A fixed `created` stamp makes the file bytes reproducible (seeded runs).
+    """
+
+    def __init__(self, path, columns_for=lambda name: None, created=None):
+        self.path = path
+        self.columns_for = columns_for
+        self.book = xlsxwriter.Workbook(path, {
+            'constant_memory': True,
+            'default_date_format': DATETIME_FORMAT,
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+        })
+        if created is not None:
+            self.book.set_properties({'created': created})
+        self.header_format = self.book.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        self.sheets = {}
+
+    def sheet(self, name):
+        if name not in self.sheets:
+            self.sheets[name] = StreamingSheet(self, name)
+        return self.sheets[name]
+
+    def close(self):
+        for sheet in self.sheets.values():
+            sheet.close()
+        filled = [sheet for sheet in self.sheets.values() if sheet.rows]
+        for sheet in sorted(filled, key=lambda sheet: sheet.name[:31]):
+            sheet.write_to(self.book, self.header_format)
+        if not filled:
+            empty = self.book.add_worksheet('Empty_Report')
+            empty.write_row(0, 0, ['Info'], self.header_format)
+            empty.write(1, 0, 'No data generated')
+        self.book.close()
+        return {name: len(sheet) for name, sheet in self.sheets.items() if len(sheet)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,115 @@
+"""
+Claim ID shards: IDs stay unique and identical across serial, worker, template and batch generation
+"""
+
+import os
+import sys
+import copy
+import tempfile
+import numpy as np
+import yaml
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from src.claim_ids import ClaimIdAllocator
+
+MEASURE = 'SMD'
+TESTCASE = os.path.join(PROJECT_ROOT, 'data', 'SMD_MY2026_TestCase.xlsx')
+VSD = os.path.join(PROJECT_ROOT, 'tests', 'delta', 'dummy_vsd.xlsx')
+
+def test_allocator_shards():
+    ids = ClaimIdAllocator(shard_size=3)
+    ids.open_shard(2)
+    assert [ids.next() for _ in range(3)] == [7, 8, 9]
+    try:
+        ids.next()
+    except OverflowError:
+        pass
+    else:
+        raise AssertionError("An exhausted shard must not spill into the next one")
+    ids.open_shard()
+    assert ids.shard == 3 and ids.next() == 10
+    assert ids.shard_start(np.arange(3)).tolist() == [1, 4, 7]
+
+def _scenarios():
+    from main import _is_standard_format
+    from src.parser import TestCaseParser
+    from src.standard_parser import StandardFormatParser
+    with open(os.path.join(PROJECT_ROOT, 'config', f'{MEASURE}.yaml')) as f:
+        measure_config = yaml.safe_load(f)
+    parser = StandardFormatParser(TESTCASE) if _is_standard_format(TESTCASE) else TestCaseParser(TESTCASE)
+    scenarios = parser.parse_scenarios(measure_config)
+    # Structural twins (same scenario, another member) are what template reuse stamps from
+    twins = []
+    for sc in scenarios[:10]:
+        twin = copy.deepcopy(sc)
+        twin['id'] = f"{sc['id']}_TWIN"
+        twins.append(twin)
+    return scenarios + twins
+
+def _engine(reuse_templates=False):
+    from src.engine import MockupEngine
+    from src.vsd import VSDManager
+    return MockupEngine(os.path.join(PROJECT_ROOT, 'config', f'{MEASURE}.yaml'), os.path.join(PROJECT_ROOT, 'config', 'schema_map.yaml'),
+                        vsd_manager=VSDManager(VSD), measure_name_override=MEASURE, seed=7, reuse_templates=reuse_templates,
+                        columns_path=os.path.join(PROJECT_ROOT, 'data_columns_info.json'))
+
+def _claim_ids(engine, data_store):
+    """{column: [claim IDs in output order]} over every allocator-filled column."""
+    out = {}
+    for table_name, columns in engine._claim_columns.items():
+        for col in columns:
+            out[col] = [row[col] for row in data_store.get(table_name, []) if row.get(col)]
+    return out
+
+def _serial(engine, scenarios):
+    data_store = {layout.name: [] for layout in engine.layouts.values()}
+    for idx, sc in enumerate(scenarios):
+        for table_name, row in engine.generate_scenario_rows(sc, idx):
+            if table_name in data_store:
+                data_store[table_name].append(row)
+    return data_store
+
+def test_claim_ids_unique_across_modes():
+    previous = os.environ.get('VSD_CACHE_DIR')
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ['VSD_CACHE_DIR'] = cache_dir  # inherited by the worker processes
+        try:
+            _check_modes()
+        finally:
+            if previous is None:
+                os.environ.pop('VSD_CACHE_DIR', None)
+            else:
+                os.environ['VSD_CACHE_DIR'] = previous
+
+def _check_modes():
+    from src.parallel import generate_parallel
+    scenarios = _scenarios()
+
+    engine = _engine()
+    expected = _claim_ids(engine, _serial(engine, scenarios))
+    assert sum(len(ids) for ids in expected.values()) > len(scenarios)
+    all_ids = [i for ids in expected.values() for i in ids]
+    assert len(all_ids) == len(set(all_ids)), "Duplicate claim IDs in the serial run"
+
+    results = {}
+    for name, reuse in (('workers', False), ('templates+workers', True)):
+        engine = _engine(reuse)
+        data_store = {layout.name: [] for layout in engine.layouts.values()}
+        results[name] = _claim_ids(engine, generate_parallel(engine, scenarios, 2, data_store))
+    engine = _engine(reuse_templates=True)
+    results['templates'] = _claim_ids(engine, _serial(engine, scenarios))
+    assert engine._templates, "Twins should have been stamped from templates"
+    engine = _engine()
+    batch = engine.generate_batch(scenarios)
+    results['batch'] = _claim_ids(engine, {name: rows.to_rows() for name, rows in batch.items()})
+
+    for name, ids in results.items():
+        assert ids == expected, f"Claim IDs differ in {name} mode"
+
+if __name__ == '__main__':
+    test_allocator_shards()
+    test_claim_ids_unique_across_modes()
+    print("✅ Claim ID tests passed")
@@ -0,0 +1,118 @@
+"""
+Output cache: key stability, store/fetch round trip and eviction by age, size and staleness
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.output_cache import OutputCache
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+def _set_last_used(cache, key, when):
+    with open(cache.index_path) as f:
+        index = json.load(f)
+    index[key]['last_used'] = when
+    with open(cache.index_path, 'w') as f:
+        json.dump(index, f)
+
+def test_key():
+    with tempfile.TemporaryDirectory() as folder:
+        tc = _write(os.path.join(folder, 'tc.xlsx'), b'scenarios v1')
+        vsd = _write(os.path.join(folder, 'vsd.xlsx'), b'value sets')
+        files = {'testcase': tc, 'vsd': vsd}
+        options = {'seed': 7, 'batch': False}
+        key = OutputCache.key(files, options)
+
+        assert OutputCache.key(dict(files), dict(options)) == key
+        # Same content at another path is the same input
+        copy = _write(os.path.join(folder, 'other', 'tc.xlsx'), b'scenarios v1')
+        assert OutputCache.key({'testcase': copy, 'vsd': vsd}, options) == key
+        assert OutputCache.key(files, {'seed': 8, 'batch': False}) != key
+        assert OutputCache.key(files, {'seed': 7, 'batch': True}) != key
+        assert OutputCache.key({'testcase': vsd, 'vsd': tc}, options) != key
+
+        time.sleep(0.01)  # new mtime, so the digest is recomputed
+        _write(tc, b'scenarios v2')
+        assert OutputCache.key(files, options) != key
+        os.remove(tc)
+        assert OutputCache.key(files, options) != key
+
+def test_store_and_fetch():
+    with tempfile.TemporaryDirectory() as folder:
+        cache = OutputCache(os.path.join(folder, '.cache'), max_age_days=7, max_mb=100)
+        artifact = _write(os.path.join(folder, 'out', 'SMD_Mockup.xlsx'), b'workbook')
+        report = _write(os.path.join(folder, 'out', 'SMD_Quality_Report.xlsx'), b'report')
+
+        assert cache.fetch('k1', folder) is None
+        cache.store('k1', artifact, 'SMD', extras=[report])
+        cache.store('k2', artifact, 'SMD')
+
+        restored = os.path.join(folder, 'restored')
+        os.makedirs(restored)
+        path = cache.fetch('k1', restored, require=['SMD_Quality_Report.xlsx'])
+        assert path == os.path.join(restored, 'SMD_Mockup.xlsx')
+        with open(path, 'rb') as f:
+            assert f.read() == b'workbook'
+        assert os.path.exists(os.path.join(restored, 'SMD_Quality_Report.xlsx'))
+        assert cache._load_index()['k1']['hits'] == 1
+
+        # An entry stored without the quality report cannot serve a checked run
+        assert cache.fetch('k2', restored, require=['SMD_Quality_Report.xlsx']) is None
+        assert cache.fetch('k2', restored) is not None
+
+        # Entry files deleted behind the index's back: a miss, and the entry is dropped
+        os.remove(os.path.join(cache.root, 'k2', 'SMD_Mockup.xlsx'))
+        assert cache.fetch('k2', restored) is None
+        assert 'k2' not in cache._load_index()
+
+def test_eviction():
+    with tempfile.TemporaryDirectory() as folder:
+        cache = OutputCache(os.path.join(folder, '.cache'), max_age_days=1, max_mb=1)
+        artifacts = {k: _write(os.path.join(folder, 'out', f'{k}.csv'), b'x' * 400 * 1024) for k in ('a', 'b', 'c')}
+        now = time.time()
+
+        cache.store('a', artifacts['a'], 'PSA')
+        cache.store('b', artifacts['b'], 'PSA')
+        _set_last_used(cache, 'a', now - 60)
+        _set_last_used(cache, 'b', now - 120)
+        # Third 400 KB entry overflows 1 MB: the least recently used one goes
+        cache.store('c', artifacts['c'], 'PSA')
+        index = cache._load_index()
+        assert sorted(index) == ['a', 'c']
+        assert not os.path.exists(os.path.join(cache.root, 'b'))
+
+        # A fetch refreshes last_used, so 'a' outlives an older 'c'
+        _set_last_used(cache, 'c', now - 60)
+        _set_last_used(cache, 'a', now - 120)
+        assert cache.fetch('a', folder) is not None
+        cache.store('b', artifacts['b'], 'PSA')
+        assert sorted(cache._load_index()) == ['a', 'b']
+
+        # Past max_age_days, whatever the size
+        _set_last_used(cache, 'a', now - 2 * 86400)
+        assert sorted(cache.evict()) == ['b']
+        assert not os.path.exists(os.path.join(cache.root, 'a'))
+
+        # Unindexed entry dirs are swept only once stale (a concurrent run may be writing one)
+        fresh = _write(os.path.join(cache.root, 'fresh', 'x.csv'), b'x')
+        stale = _write(os.path.join(cache.root, 'stale', 'x.csv'), b'x')
+        os.utime(os.path.dirname(stale), (now - 7200, now - 7200))
+        cache.evict()
+        assert os.path.exists(fresh) and not os.path.exists(stale)
+
+if __name__ == '__main__':
+    test_key()
+    test_store_and_fetch()
+    test_eviction()
+    print("✅ Output cache tests passed")
@@ -0,0 +1,128 @@
+"""
+VSD binary index (.idx): save/open round trip and lookup parity with the parsed VSD
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vsd import VSDManager, ValueSetStore
+
+# Rows cover the index's edge cases: shared codes, expired/future rows and open intervals
+ROWS = [
+    ('Diabetes', 'E11.9', 'ICD10CM', '2020-01-01', ''),
+    ('Diabetes', 'E10.9', 'ICD10CM', '', ''),
+    ('Diabetes', '250.00', 'ICD9CM', '2000-01-01', '2015-09-30'),
+    ('Diabetes', 'E13.9', 'ICD10CM', '2027-01-01', ''),
+    ('Outpatient', '99213', 'CPT', '', ''),
+    ('Outpatient', '99214', 'CPT', '2026-07-01', ''),
+    ('Outpatient', 'G0402', 'HCPCS', '', '2026-03-31'),
+    ('Diabetes Exclusions', 'E11.9', 'ICD10CM', '', ''),
+    ('Telehealth POS', '02', 'POS', '', ''),
+    ('Tele Visit', 'GT', 'HCPCS', '2026-01-01', ''),
+]
+YEAR = 2026
+
+def _write_vsd(folder):
+    path = os.path.join(folder, 'vsd.csv')
+    pd.DataFrame(ROWS, columns=['Value Set Name', 'Code', 'Code System', 'Effective Date', 'Expiration Date']).to_csv(path, index=False)
+    return path
+
+def _expected_codes(name, year):
+    """Reference: codes of a value set with a validity interval overlapping `year`."""
+    out = []
+    for vs, code, _, eff, exp in ROWS:
+        if vs != name:
+            continue
+        if (not eff or pd.Timestamp(eff).year <= year) and (not exp or pd.Timestamp(exp).year >= year):
+            out.append(code)
+    return out
+
+def test_store_round_trip():
+    with tempfile.TemporaryDirectory() as folder:
+        vsd = VSDManager(_write_vsd(folder), measurement_year=YEAR, use_cache=False)
+        path = os.path.join(folder, 'store.idx')
+        vsd.store.save(path)
+        loaded = ValueSetStore.open(path)
+
+        assert loaded.names == vsd.store.names
+        assert loaded.systems == vsd.store.systems
+        assert loaded.year == YEAR
+        for key in ValueSetStore.ARRAYS:
+            original, mapped = getattr(vsd.store, key), getattr(loaded, key)
+            assert mapped.dtype == original.dtype, key
+            assert np.array_equal(mapped, original), key
+            # Arrays are views into the file, each starting on a 64-byte boundary
+            assert isinstance(mapped.base, np.memmap) or isinstance(mapped, np.memmap), key
+            assert mapped.__array_interface__['data'][0] % ValueSetStore.ALIGN == 0, key
+
+        with open(path, 'r+b') as f:
+            f.write(b'NOTANIDX')
+        try:
+            ValueSetStore.open(path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("A file without the index magic must be rejected")
+
+def test_cached_lookups_match_parsed():
+    with tempfile.TemporaryDirectory() as folder:
+        vsd_path = _write_vsd(folder)
+        cache_dir = os.path.join(folder, 'cache')
+        parsed = VSDManager(vsd_path, measurement_year=YEAR, use_cache=False)
+        VSDManager(vsd_path, measurement_year=YEAR, cache_dir=cache_dir)  # writes the .idx
+        assert len(os.listdir(cache_dir)) == 1
+        cached = VSDManager(vsd_path, measurement_year=YEAR, cache_dir=cache_dir)
+        assert isinstance(cached.store.code_blob, np.memmap) or isinstance(cached.store.code_blob.base, np.memmap)
+
+        for name in sorted({r[0] for r in ROWS}):
+            assert cached.get_codes(name) == parsed.get_codes(name) == _expected_codes(name, YEAR), name
+            assert cached.get_codes(name, validate_dates=False) == [r[1] for r in ROWS if r[0] == name], name
+            for year in (2015, 2025, 2027):
+                assert cached.get_codes(name, year=year) == _expected_codes(name, year), (name, year)
+                assert cached.get_codes(name, validate_dates=False, year=year) == [r[1] for r in ROWS if r[0] == name], (name, year)
+            assert cached.get_codes(name, as_of='2026-05-01') == parsed.get_codes(name, as_of='2026-05-01'), name
+
+        for _, code, system, _, _ in ROWS:
+            assert cached.get_code_system(code) == parsed.get_code_system(code) == system, code
+        assert cached.get_code_system('NOT-A-CODE') == parsed.get_code_system('NOT-A-CODE') == 'Unknown'
+        assert cached.find_value_sets('Diabetes') == parsed.find_value_sets('Diabetes')
+        # Fuzzy fallback only picks value sets with codes in the requested year
+        assert cached.get_codes('Tele') == ['GT']
+        assert cached.get_codes('Tele', year=2025) == parsed.get_codes('Tele', year=2025) == ['02']
+
+        cached.reseed(7)
+        parsed.reseed(7)
+        assert cached.sample_codes('Outpatient', 20)[0].tolist() == parsed.sample_codes('Outpatient', 20)[0].tolist()
+        drawn = cached.sample_codes('Diabetes', 200, validate_dates=False, year=2015)[0]
+        assert set(drawn.tolist()) == {r[1] for r in ROWS if r[0] == 'Diabetes'}
+
+def test_cache_replaces_stale_index():
+    with tempfile.TemporaryDirectory() as folder:
+        vsd_path = _write_vsd(folder)
+        cache_dir = os.path.join(folder, 'cache')
+        VSDManager(vsd_path, measurement_year=YEAR, cache_dir=cache_dir)
+        VSDManager(vsd_path, measurement_year=YEAR - 1, cache_dir=cache_dir)
+        other = os.path.join(folder, 'other_vsd.csv')
+        pd.read_csv(vsd_path).to_csv(other, index=False)
+        VSDManager(other, measurement_year=YEAR, cache_dir=cache_dir)
+        before = set(os.listdir(cache_dir))
+        assert len(before) == 3
+
+        # A re-upload under the same name replaces that file's index for that year only
+        pd.DataFrame(ROWS[:3], columns=['Value Set Name', 'Code', 'Code System', 'Effective Date', 'Expiration Date']).to_csv(vsd_path, index=False)
+        vsd = VSDManager(vsd_path, measurement_year=YEAR, cache_dir=cache_dir)
+        after = set(os.listdir(cache_dir))
+        assert len(after) == 3 and os.path.basename(vsd.cache_path) in after
+        assert len(before - after) == 1 and (before - after).pop().startswith(f'vsd_MY{YEAR}_')
+
+if __name__ == '__main__':
+    test_store_round_trip()
+    test_cached_lookups_match_parsed()
+    test_cache_replaces_stale_index()
+    print("✅ VSD index tests passed")